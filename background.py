@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+import metrics
+
+
+log = logging.getLogger(__name__)
+
+
+# Runs decorative Telegram calls (reactions, sticker cleanup) off the reply path.
+# Concurrency is bounded, failures are logged and counted but never reach the
+# handler, and new work is dropped once `max_pending` tasks are queued.
+class BackgroundTasks:
+    def __init__(self, max_concurrency=32, max_pending=1000):
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def spawn(self, coro, label):
+        if len(self._tasks) >= self.max_pending:
+            coro.close()
+            self.dropped += 1
+            return None
+        task = asyncio.create_task(self._run(coro, label))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, coro, label):
+        async with self._semaphore:
+            try:
+                await coro
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                metrics.errors.inc("background")
+                log.warning("background_error task=%s error=%r", label, e)
+
+    # Wait for everything scheduled so far (used on shutdown and in benchmarks)
+    async def drain(self):
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,64 @@
+# Upstream calls and reply latency for a burst of common first-turn questions,
+# with the response cache off and on.
+#
+#   python benchmarks/bench_cache.py --updates 500 --waves 3
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from llm import LLMClient
+from background import BackgroundTasks
+from response_cache import ResponseCache
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+FAQ = ["hi", "Hi!", "hello", "what can you do?", "What can you do", "who made you?", "help me", "HELLO"]
+
+
+async def run(cached, args):
+    bot = FakeBot()
+    context = make_context(bot)
+    groq = FakeAsyncGroq(latency=args.latency)
+    main.RESPONSE_CACHE = cached
+    main.response_cache = ResponseCache()
+    main.llm_client = LLMClient(groq, max_concurrency=main.MAX_CONCURRENT_AI)
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    main.THINKING_STICKER = False
+    latencies = []
+
+    async def one(user_id, text):
+        started = time.perf_counter()
+        await main.ai_response(make_update(bot, user_id, text), context)
+        latencies.append(time.perf_counter() - started)
+
+    # each wave is a burst of new users asking common first questions
+    user_id = 0
+    for _ in range(args.waves):
+        burst = []
+        for i in range(args.updates):
+            user_id += 1
+            burst.append(one(user_id, FAQ[i % len(FAQ)]))
+        await asyncio.gather(*burst)
+    await main.background.drain()
+    return groq.calls, statistics.median(latencies), main.response_cache.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=300, help="messages per wave")
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq latency (s)")
+    args = parser.parse_args()
+
+    for name, cached in (("no cache", False), ("cache", True)):
+        calls, p50, stats = asyncio.run(run(cached, args))
+        print(f"{name:<9} {calls:>5} upstream calls   reply p50 {p50 * 1000:>6.0f} ms   {stats}")
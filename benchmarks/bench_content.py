@@ -0,0 +1,93 @@
+# Jokes/stories: the old functions (literal list rebuilt + random.choice on
+# every call) versus content.ContentLibrary. Reports time per call, repeats a
+# user sees in their first picks, per-user state memory and a hot reload.
+#
+#   python benchmarks/bench_content.py --calls 200000 --users 1000 --picks 30
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import content
+
+
+# The previous my_jokes_and_story.get_my_jokes(), rebuilt from the data file
+def legacy_function(items):
+    source = "def legacy():\n    items = [\n" + "".join(f"        {item!r},\n" for item in items) + "    ]\n"
+    source += "    return random.choice(items)\n"
+    namespace = {"random": random}
+    exec(source, namespace)
+    return namespace["legacy"]
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def repeats(pick, users, picks):
+    total = 0
+    for user_id in range(users):
+        shown = [pick(user_id) for _ in range(picks)]
+        total += picks - len(set(shown))
+    return total / users
+
+
+def state_memory(library, users):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for user_id in range(users):
+        library.joke(user_id)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / users
+
+
+def hot_reload(tmp):
+    path = os.path.join(tmp, "content.json")
+    shutil.copy(content.DATA_PATH, path)
+    library = content.ContentLibrary(path, check_interval=0)
+    before = len(library.jokes)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["jokes"].append("Why did the benchmark reload? Its data file changed.")
+    time.sleep(0.01)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.utime(path, (time.time() + 1, time.time() + 1))
+    library.joke(1)
+    return before, len(library.jokes), library.reloads
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--picks", type=int, default=30, help="jokes asked for per user")
+    parser.add_argument("--state-users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with open(content.DATA_PATH, encoding="utf-8") as f:
+        raw_jokes = json.load(f)["jokes"]
+    legacy = legacy_function(raw_jokes)
+    library = content.ContentLibrary(max_users=args.state_users)
+    print(f"{len(raw_jokes)} jokes in the data file, {len(library.jokes)} after dedupe")
+
+    print(f"legacy     {per_call(lambda i: legacy(), args.calls):>6.0f} ns/call   "
+          f"{repeats(lambda u: legacy(), args.users, args.picks):>5.2f} repeats in {args.picks} picks/user")
+    print(f"library    {per_call(lambda i: library.joke(i % args.users), args.calls):>6.0f} ns/call   "
+          f"{repeats(library.joke, args.users, args.picks):>5.2f} repeats in {args.picks} picks/user")
+    print(f"per-user state {state_memory(content.ContentLibrary(max_users=args.state_users), args.state_users):.0f} "
+          f"bytes/user ({args.state_users} users)")
+    with tempfile.TemporaryDirectory() as tmp:
+        before, after, reloads = hot_reload(tmp)
+    print(f"hot reload: {before} -> {after} jokes, {reloads} reload")
@@ -0,0 +1,49 @@
+# Prompt size of a long chat: full-history resend vs the token-budgeted window.
+#
+#   python benchmarks/bench_context.py --turns 200 --chars 1200
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from conversation import estimate_tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--chars", type=int, default=1200, help="characters per reply")
+    parser.add_argument("--model", default=main.LARGE_MODEL, choices=main.AVAILABLE_MODELS)
+    args = parser.parse_args()
+
+    budget = main.MODEL_TOKEN_BUDGETS[args.model]
+    conversation = main.new_conversation()
+    old_history = []
+    old_total = new_total = 0
+    old_peak = new_peak = 0
+
+    for turn in range(args.turns):
+        question = f"question number {turn}, please explain in detail"
+        reply = "x" * args.chars
+
+        # previous behaviour: last MAX_HISTORY raw messages, whole list resent
+        old_history.append(question)
+        old_history = old_history[-main.MAX_HISTORY:]
+        old_tokens = sum(estimate_tokens(m) for m in old_history)
+        old_history.append(reply)
+
+        conversation.append("user", question)
+        _, new_tokens = conversation.window(budget)
+        conversation.append("assistant", reply)
+
+        old_total += old_tokens
+        new_total += new_tokens
+        old_peak = max(old_peak, old_tokens)
+        new_peak = max(new_peak, new_tokens)
+
+    print(f"model {args.model}, budget {budget} tokens, {args.turns} turns")
+    print(f"full history   total {old_total:>10} prompt tokens   peak {old_peak:>7}/request")
+    print(f"token window   total {new_total:>10} prompt tokens   peak {new_peak:>7}/request")
+    print(f"saving         {100 * (1 - new_total / old_total):.1f}%")
@@ -0,0 +1,78 @@
+# Memory use of the conversation-history backends for many simulated users.
+#
+#   python benchmarks/bench_history_store.py --users 100000 --turns 5
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from history_store import MemoryHistoryStore, SQLiteHistoryStore
+
+
+def fill_legacy(users, turns, text):
+    # previous behaviour: defaultdict(list) of raw message dicts, never evicted
+    history = defaultdict(list)
+    for user_id in range(users):
+        for _ in range(turns):
+            history[user_id].append({"role": "user", "content": text()})
+            history[user_id].append({"role": "assistant", "content": text()})
+    return history
+
+
+def fill_store(store, users, turns, text):
+    for user_id in range(users):
+        for _ in range(turns):
+            conversation = store.get(user_id)
+            conversation.append("user", text())
+            conversation.append("assistant", text())
+            store.save(user_id, conversation)
+    return store
+
+
+def measure(name, fill):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fill()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {current / 2**20:>8.1f} MiB held   {peak / 2**20:>8.1f} MiB peak   "
+          f"{len(result):>7} users resident   {elapsed:>6.1f} s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--chars", type=int, default=200)
+    parser.add_argument("--max-users", type=int, default=20_000, help="cap for the bounded memory store")
+    args = parser.parse_args()
+
+    # distinct strings per message, like real chat text
+    text = lambda: os.urandom(args.chars // 2).hex()
+    print(f"{args.users} users x {args.turns} turns, {args.chars}-char messages")
+
+    measure("defaultdict(list) [old]", lambda: fill_legacy(args.users, args.turns, text))
+    measure("MemoryHistoryStore unbounded",
+            lambda: fill_store(MemoryHistoryStore(main.new_conversation, max_users=args.users, max_bytes=2**40),
+                               args.users, args.turns, text))
+    measure(f"MemoryHistoryStore {args.max_users} cap",
+            lambda: fill_store(MemoryHistoryStore(main.new_conversation, max_users=args.max_users),
+                               args.users, args.turns, text))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        store = measure("SQLiteHistoryStore",
+                        lambda: fill_store(SQLiteHistoryStore(main.new_conversation, path=path),
+                                           args.users, args.turns, text))
+        store.flush()
+        print(f"{'':<28} cache {len(store.cache)} users, {store.writes} row writes, "
+              f"db file {os.path.getsize(path) / 2**20:.1f} MiB")
+        store.close()
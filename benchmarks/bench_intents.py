@@ -0,0 +1,68 @@
+# Routing accuracy on the labeled corpus (intent_corpus.tsv) and messages/sec,
+# old substring checks versus the compiled intent router.
+#
+#   python benchmarks/bench_intents.py --rounds 2000
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import IntentRouter, JOKE_PATTERNS, STORY_PATTERNS
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.tsv")
+
+
+def load_corpus():
+    corpus = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                label, text = line.rstrip("\n").split("\t", 1)
+                corpus.append((label, text))
+    return corpus
+
+
+# The routing ai_response used before
+def legacy_classify(text):
+    if "joke" in text.lower():
+        return "joke"
+    elif "story" in text.lower():
+        return "story"
+    return None
+
+
+def evaluate(classify, corpus):
+    wrong = [(label, text) for label, text in corpus if (classify(text) or "llm") != label]
+    return 1 - len(wrong) / len(corpus), wrong
+
+
+def throughput(classify, corpus, rounds):
+    texts = [text for _, text in corpus]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            classify(text)
+    return rounds * len(texts) / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over the corpus")
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    router = IntentRouter()
+    router.register("joke", JOKE_PATTERNS, str)
+    router.register("story", STORY_PATTERNS, str)
+    corpus = load_corpus()
+    print(f"{len(corpus)} labeled messages")
+
+    for name, classify in (("substring", legacy_classify), ("intents", router.classify)):
+        accuracy, wrong = evaluate(classify, corpus)
+        rate = throughput(classify, corpus, args.rounds)
+        print(f"{name:<10} accuracy {accuracy * 100:>5.1f}%   {len(wrong):>3} misrouted   {rate:>10,.0f} msgs/s")
+        if args.show_errors:
+            for label, text in wrong:
+                print(f"    expected {label:<5} {text}")
@@ -0,0 +1,87 @@
+# Load benchmark for the ai_response completion path.
+#
+#   python benchmarks/bench_llm.py --updates 200 --latency 0.5
+#
+# "blocking" reproduces the old inline sync Groq call, "async" goes through
+# llm.LLMClient. Both run against the local fake Groq, so no network is used.
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from llm import LLMClient
+from background import BackgroundTasks
+from fake_groq import FakeGroq, FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+
+class BlockingClient:
+    in_flight = waiting = 0
+
+    def __init__(self, client):
+        self.client = client
+
+    async def complete(self, messages, model, key=None, on_first_token=None):
+        started = time.perf_counter()
+        chat_completion = self.client.chat.completions.create(messages=messages, model=model)
+        if on_first_token is not None:
+            on_first_token(time.perf_counter() - started)
+        return chat_completion.choices[0].message.content
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(llm, updates):
+    bot = FakeBot()
+    context = make_context(bot)
+    main.llm_client = llm
+    main.STREAM_REPLIES = False
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    latencies = []
+
+    # every update arrives at once, so latency counts time spent queued behind others
+    async def one(i):
+        update = make_update(bot, user_id=i, text=f"question {i}")
+        await main.ai_response(update, context)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(updates)))
+    elapsed = time.perf_counter() - started
+    await main.background.drain()
+    return {
+        "updates/sec": updates / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def report(name, result):
+    print(f"{name:<9} {result['updates/sec']:>10.1f} upd/s   "
+          f"p50 {result['p50'] * 1000:>8.0f} ms   p99 {result['p99'] * 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake completion latency (s)")
+    parser.add_argument("--concurrency", type=int, default=main.MAX_CONCURRENT_AI)
+    args = parser.parse_args()
+
+    blocking = BlockingClient(FakeGroq(latency=args.latency))
+    report("blocking", asyncio.run(run(blocking, args.updates)))
+
+    llm = LLMClient(FakeAsyncGroq(latency=args.latency), max_concurrency=args.concurrency)
+    report("async", asyncio.run(run(llm, args.updates)))
+    print(f"async client stats: {llm.stats()}")
@@ -0,0 +1,101 @@
+# Cost of the instrumentation on the hot path: metric updates, print() versus
+# queued and sampled logging per message, and a scrape of the /metrics endpoint
+# after a burst of ai_response calls.
+#
+#   python benchmarks/bench_metrics.py --ops 200000 --messages 20000
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import metrics
+import logs
+from llm import LLMClient
+from background import BackgroundTasks
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context, free_port
+
+
+def per_op(fn, ops):
+    started = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - started) / ops * 1e9
+
+
+def metric_costs(ops):
+    registry = []
+    counter = metrics.Counter("c", "counter", ["stage"], registry=registry)
+    histogram = metrics.Histogram("h", "histogram", ["handler"], registry=registry)
+    return {
+        "counter.inc": per_op(lambda i: counter.inc("llm"), ops),
+        "histogram.observe": per_op(lambda i: histogram.observe(i % 1000 / 1000, "ai_response"), ops),
+    }
+
+
+# stdout goes to a pipe-like sink that is slow to write to, like a busy terminal
+class SlowSink(io.StringIO):
+    def write(self, text):
+        time.sleep(0.00002)
+        return super().write(text)
+
+
+def logging_costs(messages):
+    sink = SlowSink()
+    with redirect_stdout(sink):
+        print_ns = per_op(lambda i: print(f"User message: question {i}"), messages)
+
+        log = logging.getLogger("bench")
+        listener = logs.setup_logging("INFO", max_per_second=50)
+        logged_ns = per_op(lambda i: log.info("message user=%s chars=%d", i, 10), messages)
+        listener.stop()
+    return {"print": print_ns, "sampled log": logged_ns, "dropped": logs.sampler.dropped}
+
+
+async def scrape(updates):
+    bot = FakeBot()
+    context = make_context(bot)
+    main.llm_client = LLMClient(FakeAsyncGroq(latency=0.05), max_concurrency=main.MAX_CONCURRENT_AI)
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    main.THINKING_STICKER = False
+    handler = main.instrumented("ai_response", main.ai_response)
+    await asyncio.gather(*(handler(make_update(bot, i, f"question {i}"), context) for i in range(updates)))
+    await main.background.drain()
+
+    server = metrics.MetricsServer("127.0.0.1", free_port())
+    await server.start()
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = (await reader.read()).decode()
+    writer.close()
+    await server.close()
+    return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, ns in metric_costs(args.ops).items():
+        print(f"{name:<18} {ns:>7.0f} ns/op")
+    costs = logging_costs(args.messages)
+    print(f"print()            {costs['print']:>7.0f} ns/message")
+    print(f"sampled log        {costs['sampled log']:>7.0f} ns/message   ({costs['dropped']} of {args.messages} sampled out)")
+
+    body = asyncio.run(scrape(args.updates))
+    lines = [line for line in body.splitlines() if line.startswith(("bot_handler_seconds_count", "bot_llm_request_seconds_count",
+                                                                   "bot_history_users", 'bot_llm{stat="completed"}'))]
+    print(body.splitlines()[0])
+    print("\n".join(lines))
@@ -0,0 +1,85 @@
+# End-to-end reply latency: old sequential pipeline vs the answer-first pipeline.
+#
+#   python benchmarks/bench_pipeline.py --updates 100 --api-latency 0.08
+#
+# "legacy" replays the previous ai_response sequence (sticker send, AI call,
+# sticker delete, sleep 0.3, reaction, reply). Latency is measured until the
+# answer message is sent to the chat.
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import reaction
+from llm import LLMClient
+from background import BackgroundTasks
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+
+async def legacy_ai_response(update, context):
+    sticker = await context.bot.send_sticker(chat_id=update.effective_chat.id, sticker=main.THINKING_STICKER_ID)
+    answer = await main.llm_client.complete([{"role": "user", "content": update.message.text}],
+                                            main.AVAILABLE_MODELS[main.LARGE_MODEL])
+    await sticker.delete()
+    await asyncio.sleep(0.3)
+    await update.message.set_reaction(reaction=[reaction.reaction()])
+    await update.message.reply_text(answer)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(handler, args):
+    bot = FakeBot(api_latency=args.api_latency)
+    context = make_context(bot)
+    main.STREAM_REPLIES = False
+    main.llm_client = LLMClient(FakeAsyncGroq(latency=args.latency), max_concurrency=main.MAX_CONCURRENT_AI)
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    latencies = []
+
+    async def one(i):
+        update = make_update(bot, user_id=i, text=f"question {i}")
+        original_reply_text = update.message.reply_text
+        started = time.perf_counter()
+
+        async def reply_text(text, **kwargs):
+            message = await original_reply_text(text, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            return message
+
+        update.message.reply_text = reply_text
+        await handler(update, context)
+
+    await asyncio.gather(*(one(i) for i in range(args.updates)))
+    await main.background.drain()
+    return statistics.median(latencies), percentile(latencies, 99), sum(bot.calls.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq latency (s)")
+    parser.add_argument("--api-latency", type=float, default=0.08, help="fake Telegram round trip (s)")
+    args = parser.parse_args()
+
+    runs = [
+        ("legacy", legacy_ai_response, True),
+        ("pipeline", main.ai_response, True),
+        ("no sticker", main.ai_response, False),
+    ]
+    for name, handler, sticker in runs:
+        main.THINKING_STICKER = sticker
+        p50, p99, calls = asyncio.run(run(handler, args))
+        print(f"{name:<11} reply p50 {p50 * 1000:>6.0f} ms   p99 {p99 * 1000:>6.0f} ms   "
+              f"{calls / args.updates:.1f} Telegram calls/update   background {main.background.stats()}")
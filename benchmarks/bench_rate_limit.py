@@ -0,0 +1,94 @@
+# Admission control, fairness and 429 handling against a throttling fake Groq.
+#
+#   python benchmarks/bench_rate_limit.py --noisy 100 --users 20
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from llm import LLMClient
+from background import BackgroundTasks
+from rate_limit import RateLimiter
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+NOISY_USER = 1
+
+
+# One chat queues `noisy` requests, then `users` other chats ask once each.
+# FIFO makes everyone wait behind the noisy chat; fair scheduling does not.
+async def fairness(fair, args):
+    llm = LLMClient(FakeAsyncGroq(latency=args.latency), max_concurrency=args.concurrency)
+    messages = [{"role": "user", "content": "hi"}]
+    latencies = []
+
+    async def ask(user_id):
+        started = time.perf_counter()
+        await llm.complete(messages, "model", key=user_id if fair else None)
+        if user_id != NOISY_USER:
+            latencies.append(time.perf_counter() - started)
+
+    noisy = [asyncio.create_task(ask(NOISY_USER)) for _ in range(args.noisy)]
+    await asyncio.sleep(0)
+    await asyncio.gather(*(ask(NOISY_USER + 1 + i) for i in range(args.users)), *noisy)
+    return statistics.median(latencies)
+
+
+# The same traffic through ai_response with admission control on, against an
+# upstream that allows `upstream_rate` calls per second.
+async def admission(args):
+    bot = FakeBot()
+    context = make_context(bot)
+    groq = FakeAsyncGroq(latency=args.latency, rate_limit=args.upstream_rate)
+    main.llm_client = LLMClient(groq, max_concurrency=args.concurrency)
+    main.rate_limiter = RateLimiter(main.USER_RATE, main.USER_BURST, main.GLOBAL_RATE, main.GLOBAL_BURST)
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.STREAM_REPLIES = False
+    main.THINKING_STICKER = False
+    replies = {"answered": 0, "busy": 0}
+
+    async def one(user_id, i):
+        update = make_update(bot, user_id, f"question {i}")
+        original_reply_text = update.message.reply_text
+
+        async def reply_text(text, **kwargs):
+            replies["busy" if text == main.BUSY_TEXT else "answered"] += 1
+            return await original_reply_text(text, **kwargs)
+
+        update.message.reply_text = reply_text
+        await main.ai_response(update, context)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(one(NOISY_USER, i) for i in range(args.noisy)),
+        *(one(NOISY_USER + 1 + i, i) for i in range(args.users)),
+    )
+    elapsed = time.perf_counter() - started
+    await main.background.drain()
+    return replies, elapsed, main.rate_limiter.stats(), main.llm_client.stats(), groq.throttled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--noisy", type=int, default=100, help="requests from the noisy chat")
+    parser.add_argument("--users", type=int, default=20, help="other chats, one request each")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Groq latency (s)")
+    parser.add_argument("--upstream-rate", type=int, default=10, help="fake Groq calls/sec before 429")
+    args = parser.parse_args()
+
+    for name, fair in (("fifo", False), ("fair", True)):
+        p50 = asyncio.run(fairness(fair, args))
+        print(f"{name:<5} other chats' latency p50 {p50 * 1000:>7.0f} ms")
+
+    replies, elapsed, limiter, llm, upstream_429s = asyncio.run(admission(args))
+    print(f"ai_response: {replies} in {elapsed:.2f} s")
+    print(f"  admission {limiter}")
+    print(f"  upstream 429s {upstream_429s}, client {llm}")
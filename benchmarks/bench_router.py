@@ -0,0 +1,106 @@
+# Reply latency and error replies with every message on one model versus the
+# model router, with both models healthy and with the large model degraded.
+#
+#   python benchmarks/bench_router.py --updates 300 --long-share 0.2
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from llm import LLMClient
+from router import ModelRouter
+from background import BackgroundTasks
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+ERROR_TEXT = "I didn't understand. Try asking something else!"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(routed, degraded, args):
+    bot = FakeBot()
+    context = make_context(bot)
+    llama, gemma = main.AVAILABLE_MODELS["llama"], main.AVAILABLE_MODELS["gemma"]
+    groq = FakeAsyncGroq(
+        model_latency={llama: args.slow_latency if degraded else args.large_latency, gemma: args.small_latency},
+        error_rate={llama: args.error_rate} if degraded else 0.0,
+    )
+    main.llm_client = LLMClient(groq, max_concurrency=main.MAX_CONCURRENT_AI)
+    if routed:
+        main.model_router = ModelRouter(main.AVAILABLE_MODELS, main.SMALL_MODEL, main.LARGE_MODEL,
+                                        long_prompt_tokens=main.LONG_PROMPT_TOKENS)
+    else:
+        main.model_router = ModelRouter([main.LARGE_MODEL], main.LARGE_MODEL, main.LARGE_MODEL)
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    main.STREAM_REPLIES = False
+    main.THINKING_STICKER = False
+    latencies = []
+    errors = 0
+
+    # some users carry a long history, so their prompts go to the large model
+    rng = random.Random(1)
+    for user_id in range(args.users):
+        if rng.random() < args.long_share:
+            conversation = main.history_store.get(user_id)
+            for turn in range(6):
+                conversation.append("user", f"long question {turn} " + "x" * 1000)
+                conversation.append("assistant", "y" * 1000)
+            main.history_store.save(user_id, conversation)
+
+    async def one(i):
+        nonlocal errors
+        update = make_update(bot, i % args.users, f"question {i}")
+        original_reply_text = update.message.reply_text
+        started = time.perf_counter()
+
+        async def reply_text(text, **kwargs):
+            nonlocal errors
+            latencies.append(time.perf_counter() - started)
+            errors += text == ERROR_TEXT
+            return await original_reply_text(text, **kwargs)
+
+        update.message.reply_text = reply_text
+        await main.ai_response(update, context)
+
+    # arrivals spread over `duration` seconds so the router's stats can steer
+    for i in range(args.updates):
+        asyncio.create_task(one(i))
+        await asyncio.sleep(args.duration / args.updates)
+    while len(latencies) < args.updates:
+        await asyncio.sleep(0.05)
+    await main.background.drain()
+    calls = {name: groq.calls_by_model.get(model, 0) for name, model in main.AVAILABLE_MODELS.items()}
+    return statistics.median(latencies), percentile(latencies, 99), errors, calls, main.model_router.fallbacks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds over which updates arrive")
+    parser.add_argument("--long-share", type=float, default=0.2, help="share of users with a long history")
+    parser.add_argument("--large-latency", type=float, default=0.8, help="llama latency (s)")
+    parser.add_argument("--small-latency", type=float, default=0.25, help="gemma latency (s)")
+    parser.add_argument("--slow-latency", type=float, default=3.0, help="llama latency when degraded (s)")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="llama error rate when degraded")
+    args = parser.parse_args()
+
+    for degraded in (False, True):
+        print("llama degraded" if degraded else "both models healthy")
+        for name, routed in (("llama only", False), ("router", True)):
+            p50, p99, errors, calls, fallbacks = asyncio.run(run(routed, degraded, args))
+            print(f"  {name:<11} reply p50 {p50 * 1000:>6.0f} ms   p99 {p99 * 1000:>6.0f} ms   "
+                  f"errors {errors:>3}   calls {calls}   fallbacks {fallbacks}")
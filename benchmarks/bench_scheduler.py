@@ -0,0 +1,45 @@
+# Burst load beyond what Groq can serve: latency per update class, shed and
+# superseded AI messages and Groq calls, with every update handled as it comes
+# (PTB's plain concurrent_updates) versus the priority update processor.
+# The bot is scaled down (AI concurrency, slots and queue) so the burst
+# saturates it without saturating this machine's CPU first.
+#
+#   python benchmarks/bench_scheduler.py --updates 1200 --rate 60
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import run
+
+# update kinds by class, highest priority first
+KINDS = ("/start", "/help", "/clear", "joke", "story", "message")
+
+
+if __name__ == "__main__":
+    args = run.parse_args(["--groq-latency", "2.0", "--groq-jitter", "0.5", "--no-stream", "--no-sticker",
+                           "--users", "200", *sys.argv[1:]])
+    main.MAX_CONCURRENT_AI = 16
+    main.CONCURRENT_UPDATES = 64
+    main.MAX_RUNNING_AI = 32
+    main.MAX_QUEUED_AI = 64
+    main.AI_MAX_WAIT = 10
+    logging.getLogger("scheduler").setLevel(logging.ERROR)
+    stream = run.synthetic_stream(args.updates, args.users, args.rate, args.seed)
+
+    for name, scheduling in (("plain", False), ("priority", True)):
+        main.PRIORITY_SCHEDULING = scheduling
+        result = asyncio.run(run.run(stream, args))
+        print(f"{name:<9} {result['throughput']:>6.1f} updates/s, loop lag p99 {result['loop_lag']['p99'] * 1000:.0f} ms")
+        for kind in KINDS:
+            stats = result["latency"].get(kind)
+            if stats:
+                print(f"  {kind:<8} p50 {stats['p50'] * 1000:>7.0f} ms   p99 {stats['p99'] * 1000:>7.0f} ms   "
+                      f"max {stats['max'] * 1000:>7.0f} ms")
+        stats = main.update_processor.stats() if scheduling else {}
+        print(f"  groq calls {result['groq']['calls']}, shed {stats.get('shed', 0)} "
+              f"(expired {stats.get('expired', 0)}), superseded {stats.get('superseded', 0)}, "
+              f"errors {result['errors']}")
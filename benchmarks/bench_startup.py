@@ -0,0 +1,87 @@
+# Cold start: time from launching a fresh interpreter until main is imported,
+# until post_init is done (the bot starts taking updates) and until the first
+# update, a joke request, is answered. Runs the real run_polling path against
+# the fake Bot API. "eager" mimics the old startup: Groq client, intent
+# patterns and content built at import, command menu awaited before polling.
+#
+#   python benchmarks/bench_startup.py --runs 5 --api-latency 0.1
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def child(args):
+    started = float(os.environ["BENCH_STARTED"])
+    timings = {}
+    import main
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    if args.eager:
+        import groq
+        main.llm_client.client
+        main.intents.classify("")
+        main.content.library.maybe_reload()
+    timings["import"] = time.time() - started
+
+    main.metrics_server.port = 0
+    app = main.build_application(token="123:FAKE", base_url=args.base_url)
+    startup = app.post_init
+
+    async def eager_startup(app):
+        await main.set_manu(app)
+        await main.start_monitoring(app)
+
+    async def timed_startup(app):
+        await (eager_startup if args.eager else startup)(app)
+        timings["serving"] = time.time() - started
+
+    async def answered(update, context):
+        timings.setdefault("first_update", time.time() - started)
+        app.stop_running()
+
+    app.post_init = timed_startup
+    app.add_handler(TypeHandler(Update, answered), group=1)
+    app.run_polling()
+    print(json.dumps(timings))
+
+
+def launch(eager, base_url):
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--base-url", base_url]
+    if eager:
+        command.append("--eager")
+    env = {**os.environ, "BENCH_STARTED": repr(time.time())}
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--api-latency", type=float, default=0.1, help="Bot API round trip (s)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--eager", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        sys.exit()
+
+    from fake_telegram import FakeBotAPI, update_json
+
+    for name, eager in (("eager", True), ("lazy", False)):
+        runs = []
+        for i in range(args.runs):
+            api = FakeBotAPI(api_latency=args.api_latency, updates=[update_json(1, 1, "tell me a joke")]).start()
+            try:
+                runs.append(launch(eager, api.base_url))
+            finally:
+                api.stop()
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{name:<6} import {median['import'] * 1000:>5.0f} ms   serving {median['serving'] * 1000:>5.0f} ms   "
+              f"first update answered {median['first_update'] * 1000:>5.0f} ms   (median of {args.runs})")
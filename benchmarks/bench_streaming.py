@@ -0,0 +1,69 @@
+# Time to first visible text: full completion vs streamed progressive edits.
+#
+#   python benchmarks/bench_streaming.py --updates 50 --words 300 --token-interval 0.01
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import streaming
+from llm import LLMClient
+from background import BackgroundTasks
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+
+async def run(stream, args):
+    bot = FakeBot(api_latency=args.api_latency)
+    context = make_context(bot)
+    main.STREAM_REPLIES = stream
+    main.llm_client = LLMClient(FakeAsyncGroq(latency=args.latency, answer_words=args.words,
+                                              token_interval=args.token_interval),
+                                max_concurrency=main.MAX_CONCURRENT_AI)
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    first_text = [None] * args.updates
+
+    async def one(i):
+        update = make_update(bot, user_id=i, text=f"question {i}")
+        started = time.perf_counter()
+        original_reply_text = update.message.reply_text
+
+        # time until the answer (not the sticker) first reaches the chat
+        async def reply_text(text, **kwargs):
+            if first_text[i] is None:
+                first_text[i] = time.perf_counter() - started
+            return await original_reply_text(text, **kwargs)
+
+        update.message.reply_text = reply_text
+        await main.ai_response(update, context)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.updates)))
+    elapsed = time.perf_counter() - started
+    await main.background.drain()
+    edits = bot.calls.get("editMessageText", 0)
+    return statistics.median(first_text), elapsed, edits
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake time to first token (s)")
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="fake Telegram round trip (s)")
+    args = parser.parse_args()
+
+    for name, stream in (("complete", False), ("stream", True)):
+        ttft, elapsed, edits = asyncio.run(run(stream, args))
+        print(f"{name:<9} first text p50 {ttft * 1000:>7.0f} ms   all done {elapsed:>6.2f} s   "
+              f"{edits / args.updates:>5.1f} edits/reply")
+    print(f"stream stats: {streaming.stream_stats.summary()}")
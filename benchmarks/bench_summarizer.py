@@ -0,0 +1,86 @@
+# Long conversations with rolling summaries off and on: reply latency, prompt
+# tokens sent for user requests (and spent on summaries), and history memory.
+#
+#   python benchmarks/bench_summarizer.py --users 50 --turns 40
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from llm import LLMClient
+from router import ModelRouter
+from summarizer import Summarizer
+from background import BackgroundTasks
+from history_store import conversation_bytes
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBot, make_update, make_context
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(summarize, args):
+    bot = FakeBot()
+    context = make_context(bot)
+    groq = FakeAsyncGroq(latency=args.latency, answer_words=args.answer_words)
+    main.llm_client = LLMClient(groq, max_concurrency=main.MAX_CONCURRENT_AI)
+    main.model_router = ModelRouter([main.LARGE_MODEL], main.LARGE_MODEL, main.LARGE_MODEL)
+    main.history_store = main.new_history_store()
+    main.background = BackgroundTasks()
+    main.summarizer = Summarizer(
+        main.llm_client, main.AVAILABLE_MODELS[main.SMALL_MODEL], main.history_store,
+        threshold_tokens=main.SUMMARY_THRESHOLD_TOKENS, keep_recent=main.SUMMARY_KEEP_RECENT,
+        input_tokens=main.MODEL_TOKEN_BUDGETS[main.SMALL_MODEL] - 1000,
+    )
+    main.SUMMARIZE = summarize
+    main.RATE_LIMITS = False
+    main.STREAM_REPLIES = False
+    main.THINKING_STICKER = False
+    latencies = []
+
+    async def chat(user_id):
+        for turn in range(args.turns):
+            update = make_update(bot, user_id, f"question {turn}: " + "please explain this in detail " * 10)
+            started = time.perf_counter()
+            await main.ai_response(update, context)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(chat(user_id) for user_id in range(args.users)))
+    await main.background.drain()
+    await main.summarizer.drain()
+
+    memory = sum(conversation_bytes(main.history_store.get(u)) for u in range(args.users))
+    return {
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "user_tokens": groq.prompt_tokens_by_model.get(main.AVAILABLE_MODELS[main.LARGE_MODEL], 0),
+        "summary_tokens": groq.prompt_tokens_by_model.get(main.AVAILABLE_MODELS[main.SMALL_MODEL], 0),
+        "memory": memory,
+        "stats": main.summarizer.stats(),
+        "user0": main.summarizer.saved_for(0),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake Groq latency (s)")
+    parser.add_argument("--answer-words", type=int, default=150, help="words per AI reply")
+    args = parser.parse_args()
+
+    for name, summarize in (("off", False), ("on", True)):
+        r = asyncio.run(run(summarize, args))
+        print(f"summaries {name:<3}  reply p50 {r['p50'] * 1000:>5.0f} ms  p99 {r['p99'] * 1000:>5.0f} ms   "
+              f"user prompt tokens {r['user_tokens']:>9,}   summary prompt tokens {r['summary_tokens']:>8,}   "
+              f"history {r['memory'] / 1024:>6.0f} KiB")
+        if summarize:
+            print(f"  {r['stats']}")
+            print(f"  user 0 saved {r['user0'][0]} prompt tokens, {r['user0'][1]} bytes")
@@ -0,0 +1,126 @@
+# Sustained updates/sec through the webhook server.
+#
+#   python benchmarks/bench_webhook.py --updates 2000 --concurrency 100
+#
+# Runs the real Application in webhook mode against the local FakeBotAPI and
+# fake Groq, POSTs synthetic updates at it and counts the replies sent.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import bot_request
+from llm import LLMClient
+from background import BackgroundTasks
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBotAPI, free_port, update_json
+
+SECRET = "bench-secret"
+TEXTS = ["hello there", "what can you do?", "explain webhooks", "/help"]
+
+
+# Minimal keep-alive HTTP/1.1 client, so the load generator costs little CPU
+# next to the bot it shares the event loop with.
+class Poster:
+    def __init__(self, port, path):
+        self.port = port
+        self.path = path
+        self.reader = self.writer = None
+
+    async def post(self, body, secret=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        payload = json.dumps(body).encode()
+        headers = [
+            f"POST /{self.path} HTTP/1.1",
+            f"Host: 127.0.0.1:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+        ]
+        if secret:
+            headers.append(f"X-Telegram-Bot-Api-Secret-Token: {secret}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run(args):
+    api = FakeBotAPI(api_latency=args.api_latency).start()
+    main.llm_client = LLMClient(FakeAsyncGroq(latency=args.latency), max_concurrency=main.MAX_CONCURRENT_AI)
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    main.PRIORITY_SCHEDULING = False     # every update gets its reply, none superseded
+    main.STREAM_REPLIES = False
+    main.THINKING_STICKER = False
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/{main.WEBHOOK_PATH}"
+    app = main.build_application(token="123:FAKE", base_url=api.base_url)
+    await app.initialize()
+    await app.updater.start_webhook(
+        listen="127.0.0.1", port=port, url_path=main.WEBHOOK_PATH, webhook_url=url, secret_token=SECRET,
+    )
+    await app.start()
+
+    # a request without the secret token must be rejected
+    poster = Poster(port, main.WEBHOOK_PATH)
+    print(f"missing secret token -> HTTP {await poster.post(update_json(0, 1, 'hi'))}")
+    poster.close()
+
+    queue = asyncio.Queue()
+    for i in range(1, args.updates + 1):
+        queue.put_nowait(update_json(i, i % args.users, TEXTS[i % len(TEXTS)]))
+
+    async def sender():
+        poster = Poster(port, main.WEBHOOK_PATH)
+        while not queue.empty():
+            await poster.post(queue.get_nowait(), secret=SECRET)
+        poster.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+    accepted = time.perf_counter() - started
+    while api.count("sendMessage") < args.updates:
+        await asyncio.sleep(0.05)
+    handled = time.perf_counter() - started
+
+    await app.updater.stop()
+    await app.stop()
+    await app.post_stop(app)
+    await app.shutdown()
+    api.stop()
+
+    print(f"{args.updates} updates accepted in {accepted:.2f} s ({args.updates / accepted:.0f}/s)")
+    print(f"{args.updates} replies sent in   {handled:.2f} s ({args.updates / handled:.0f} updates/s)")
+    print(f"timed by metrics: {main.handler_latency.count('ai_response')} ai_response runs, "
+          f"{bot_request.telegram_latency.count('sendMessage')} sendMessage calls")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel POSTs")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Groq latency (s)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="fake Telegram round trip (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
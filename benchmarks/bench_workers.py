@@ -0,0 +1,109 @@
+# Sustained updates/sec with one process versus a front process forwarding
+# updates to 1, 2 and 4 worker processes (sharded by chat).
+#
+#   python benchmarks/bench_workers.py --updates 2000 --workers 1 2 4
+#
+# Same setup as bench_webhook.py: webhook POSTs in, local FakeBotAPI and fake
+# Groq out. Scaling needs free CPU cores, one per worker plus the front.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import workers
+from llm import LLMClient
+from background import BackgroundTasks
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBotAPI, free_port, update_json
+from bench_webhook import Poster, SECRET, TEXTS
+
+
+def configure(latency, history_db):
+    main.llm_client = LLMClient(FakeAsyncGroq(latency=latency), max_concurrency=main.MAX_CONCURRENT_AI)
+    main.background = BackgroundTasks()
+    main.SUMMARIZE = False
+    main.RATE_LIMITS = False
+    main.PRIORITY_SCHEDULING = False     # every update gets its reply, none superseded
+    main.STREAM_REPLIES = False
+    main.THINKING_STICKER = False
+    main.METRICS_PORT = 0
+    main.LOG_LEVEL = "WARNING"
+    if history_db:
+        main.HISTORY_BACKEND = "sqlite"
+        main.HISTORY_DB_PATH = history_db
+        main.history_store = main.new_history_store()
+
+
+# Runs inside each worker process
+def build_bench_worker(index, base_url, latency, history_db):
+    configure(latency, history_db)
+    return main.build_worker(index, token="123:FAKE", base_url=base_url)
+
+
+async def run(worker_count, args, history_db):
+    api = FakeBotAPI(api_latency=args.api_latency).start()
+    configure(args.latency, history_db)
+    pool = None
+    if worker_count:
+        main.WORKERS = worker_count
+        pool = workers.WorkerPool(worker_count, build_bench_worker, (api.base_url, args.latency, history_db)).start()
+        pool.wait_ready(120)
+        app = main.build_front(pool, token="123:FAKE", base_url=api.base_url)
+    else:
+        app = main.build_application(token="123:FAKE", base_url=api.base_url)
+
+    port = free_port()
+    await app.initialize()
+    await app.updater.start_webhook(
+        listen="127.0.0.1", port=port, url_path=main.WEBHOOK_PATH,
+        webhook_url=f"http://127.0.0.1:{port}/{main.WEBHOOK_PATH}", secret_token=SECRET,
+    )
+    await app.start()
+
+    queue = asyncio.Queue()
+    for i in range(1, args.updates + 1):
+        queue.put_nowait(update_json(i, i % args.users, TEXTS[i % len(TEXTS)]))
+
+    async def sender():
+        poster = Poster(port, main.WEBHOOK_PATH)
+        while not queue.empty():
+            await poster.post(queue.get_nowait(), secret=SECRET)
+        poster.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+    while api.count("sendMessage") < args.updates:
+        await asyncio.sleep(0.05)
+    handled = time.perf_counter() - started
+
+    await app.updater.stop()
+    await app.stop()
+    await app.post_stop(app)
+    await app.shutdown()
+    api.stop()
+    return handled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel POSTs")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Groq latency (s)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="fake Telegram round trip (s)")
+    parser.add_argument("--sqlite", action="store_true", help="share history through a SQLite file")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    for worker_count in (0, *args.workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            history_db = os.path.join(tmp, "history.db") if args.sqlite else None
+            handled = asyncio.run(run(worker_count, args, history_db))
+        name = f"{worker_count} workers" if worker_count else "1 process"
+        print(f"{name:<10} {args.updates} replies in {handled:>6.2f} s ({args.updates / handled:>5.0f} updates/s)")
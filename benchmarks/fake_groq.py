@@ -0,0 +1,137 @@
+import asyncio
+import random
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import groq
+import httpx
+
+
+# Local stand-ins for groq.Groq / groq.AsyncGroq.
+# Only the chat.completions.create(messages=..., model=..., stream=...) surface used by the bot.
+# `latency` is the time to the first token, then `answer_words` extra words
+# are generated every `token_interval` seconds. With `rate_limit` set, calls
+# beyond that many per second fail with a real groq.RateLimitError carrying
+# a retry-after header, like the Groq API does. `model_latency` overrides
+# `latency` per model name and `error_rate` (a float, or per model) makes
+# that share of calls fail with a groq.InternalServerError. `max_tokens`
+# truncates the answer (~4 characters per token) like the real API.
+def _completion(messages, content):
+    prompt_tokens = sum(len(m["content"]) // 4 + 4 for m in messages)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens),
+    )
+
+
+def _chunk(content, usage=None):
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+    if usage is not None:
+        chunk.x_groq = SimpleNamespace(usage=usage)
+    return chunk
+
+
+class _Completions:
+    def __init__(self, owner):
+        self.owner = owner
+
+
+class _SyncCompletions(_Completions):
+    def create(self, messages, model, max_tokens=None, **kwargs):
+        self.owner.check_rate_limit()
+        self.owner.check_error(model, messages)
+        time.sleep(self.owner.next_latency(model) + self.owner.generation_time())
+        return _completion(messages, self.owner.answer(messages, max_tokens))
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, messages, model, stream=False, max_tokens=None, **kwargs):
+        self.owner.check_rate_limit()
+        self.owner.check_error(model, messages)
+        if stream:
+            return _FakeStream(self.owner, messages, model)
+        await asyncio.sleep(self.owner.next_latency(model) + self.owner.generation_time())
+        return _completion(messages, self.owner.answer(messages, max_tokens))
+
+
+class _FakeStream:
+    def __init__(self, owner, messages, model):
+        self.owner = owner
+        self.messages = messages
+        self.model = model
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.owner.next_latency(self.model))
+        for i, part in enumerate(self.owner.answer_parts(self.messages)):
+            if i:
+                await asyncio.sleep(self.owner.token_interval)
+            yield _chunk(part)
+        # like Groq, the last chunk carries no text but the usage
+        yield _chunk(None, _completion(self.messages, "").usage)
+
+    async def close(self):
+        pass
+
+
+class FakeGroq:
+    completions_class = _SyncCompletions
+
+    def __init__(self, latency=0.5, jitter=0.0, answer_words=0, token_interval=0.0, rate_limit=None,
+                 model_latency=None, error_rate=0.0):
+        self.latency = latency
+        self.model_latency = model_latency or {}
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.answer_words = answer_words
+        self.token_interval = token_interval
+        self.rate_limit = rate_limit
+        self.calls = 0
+        self.throttled = 0
+        self.failed = 0
+        self.calls_by_model = {}
+        self.prompt_tokens_by_model = {}
+        self._recent = deque()
+        self.chat = SimpleNamespace(completions=self.completions_class(self))
+
+    def check_rate_limit(self):
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - 1.0:
+            self._recent.popleft()
+        if self.rate_limit is not None and len(self._recent) >= self.rate_limit:
+            self.throttled += 1
+            retry_after = self._recent[0] + 1.0 - now
+            request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+            response = httpx.Response(429, headers={"retry-after": f"{retry_after:.3f}"}, request=request)
+            raise groq.RateLimitError("Rate limit reached", response=response, body=None)
+        self._recent.append(now)
+        self.calls += 1
+
+    def check_error(self, model, messages=()):
+        self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+        prompt_tokens = sum(len(m["content"]) // 4 + 4 for m in messages)
+        self.prompt_tokens_by_model[model] = self.prompt_tokens_by_model.get(model, 0) + prompt_tokens
+        rate = self.error_rate.get(model, 0.0) if isinstance(self.error_rate, dict) else self.error_rate
+        if rate and random.random() < rate:
+            self.failed += 1
+            request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+            response = httpx.Response(500, request=request)
+            raise groq.InternalServerError("Internal server error", response=response, body=None)
+
+    def next_latency(self, model=None):
+        latency = self.model_latency.get(model, self.latency)
+        return max(0.0, latency + random.uniform(-self.jitter, self.jitter))
+
+    def generation_time(self):
+        return self.answer_words * self.token_interval
+
+    def answer(self, messages, max_tokens=None):
+        text = "".join(self.answer_parts(messages))
+        return text if max_tokens is None else text[:max_tokens * 4]
+
+    def answer_parts(self, messages):
+        return [f"Fake answer to: {messages[-1]['content']}"] + [" lorem"] * self.answer_words
+
+
+class FakeAsyncGroq(FakeGroq):
+    completions_class = _AsyncCompletions
@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+from urllib.request import urlopen
+
+
+# In-process stand-ins for the telegram objects the handlers touch.
+# Every Bot API call sleeps for `api_latency` to model the network round trip.
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, bot, chat_id, text=None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = next(self._ids)
+        self.text = text
+
+    async def _call(self, method, text=None):
+        await self.bot.call(method)
+        return FakeMessage(self.bot, self.chat_id, text)
+
+    async def reply_text(self, text, **kwargs):
+        return await self._call("sendMessage", text)
+
+    async def reply_photo(self, photo, caption=None, **kwargs):
+        return await self._call("sendPhoto", caption)
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+        await self.bot.call("editMessageText")
+        return self
+
+    async def set_reaction(self, reaction=None, **kwargs):
+        await self.bot.call("setMessageReaction")
+        return True
+
+    async def delete(self):
+        await self.bot.call("deleteMessage")
+        return True
+
+
+class FakeBot:
+    def __init__(self, api_latency=0.0):
+        self.api_latency = api_latency
+        self.calls = {}
+
+    async def call(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    async def send_sticker(self, chat_id, sticker, **kwargs):
+        await self.call("sendSticker")
+        return FakeMessage(self, chat_id)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self.call("sendMessage")
+        return FakeMessage(self, chat_id, text)
+
+
+_update_ids = itertools.count(1)
+
+
+def make_update(bot, user_id, text):
+    user = SimpleNamespace(id=user_id, first_name=f"user{user_id}")
+    chat = SimpleNamespace(id=user_id)
+    return SimpleNamespace(
+        update_id=next(_update_ids),
+        effective_user=user,
+        effective_chat=chat,
+        message=FakeMessage(bot, user_id, text),
+    )
+
+
+def make_context(bot):
+    return SimpleNamespace(bot=bot)
+
+
+# Local stand-in for the Telegram Bot API over HTTP, for driving a real
+# Application (base_url=FakeBotAPI.base_url). Runs in its own process so it
+# does not compete with the bot for the GIL; GET /calls returns call counts.
+# With `error_rate`, that share of calls (other than getMe/getUpdates) fails
+# with HTTP 500. `updates` (update dicts) are returned by the first getUpdates.
+class FakeBotAPI:
+    MESSAGE_METHODS = {"sendMessage", "sendPhoto", "sendSticker", "editMessageText"}
+
+    def __init__(self, api_latency=0.0, port=None, error_rate=0.0, updates=()):
+        self.api_latency = api_latency
+        self.error_rate = error_rate
+        self.updates = list(updates)
+        self.port = port or free_port()
+        self.process = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    def start(self):
+        self.process = multiprocessing.Process(
+            target=_serve, args=(self.port, self.api_latency, self.error_rate, self.updates), daemon=True
+        )
+        self.process.start()
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                self.calls()
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+    def calls(self):
+        with urlopen(f"http://127.0.0.1:{self.port}/calls") as response:
+            return json.loads(response.read())
+
+    def count(self, method):
+        return self.calls().get(method, 0)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(port, api_latency, error_rate=0.0, updates=()):
+    calls = {}
+    pending = list(updates)
+    lock = threading.Lock()
+    ids = itertools.count(1)
+
+    def handle(method, params):
+        with lock:
+            calls[method] = calls.get(method, 0) + 1
+        if api_latency:
+            time.sleep(api_latency)
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        if method == "getUpdates":
+            with lock:
+                ready, pending[:] = pending[:], []
+            if not ready:
+                time.sleep(0.5)
+            return ready
+        if method in FakeBotAPI.MESSAGE_METHODS:
+            return {
+                "message_id": next(ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "text": params.get("text") or params.get("caption") or "",
+            }
+        return True
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def reply(self, payload, status=200):
+            payload = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            with lock:
+                self.reply(dict(calls))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode()
+            params = {key: values[0] for key, values in parse_qs(body).items()}
+            method = self.path.rsplit("/", 1)[-1]
+            if error_rate and method not in ("getMe", "getUpdates") and random.random() < error_rate:
+                with lock:
+                    calls["errors"] = calls.get("errors", 0) + 1
+                self.reply({"ok": False, "error_code": 500, "description": "Internal Server Error"}, 500)
+                return
+            self.reply({"ok": True, "result": handle(method, params)})
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 1024
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass    # clients hanging up mid long-poll are expected
+
+    Server(("127.0.0.1", port), Handler).serve_forever()
+
+
+def update_json(update_id, user_id, text):
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
@@ -0,0 +1,304 @@
+# Load-test / replay runner for the whole bot.
+#
+#   python benchmarks/run.py --updates 2000 --rate 100 --save benchmarks/results/baseline.json
+#   python benchmarks/run.py --replay stream.jsonl --compare benchmarks/results/baseline.json
+#
+# Builds the real Application from main.py against the local FakeBotAPI (over
+# HTTP) and a fake Groq, then feeds it a synthetic or recorded update stream
+# through the app's update processor, the same path polling and webhooks use.
+# Reports throughput, latency percentiles per update kind, event-loop lag,
+# memory growth and errors, and can save the result as JSON and compare it
+# with an earlier run.
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+
+import main
+import metrics
+from llm import LLMClient
+from background import BackgroundTasks
+from rate_limit import RateLimiter
+from router import ModelRouter
+from fake_groq import FakeAsyncGroq
+from fake_telegram import FakeBotAPI, update_json
+
+# update kind -> text, with the default share of each in a synthetic stream
+MIX = {
+    "message": 0.70,
+    "joke": 0.05,
+    "story": 0.05,
+    "/start": 0.05,
+    "/help": 0.10,
+    "/clear": 0.05,
+}
+QUESTIONS = ["hello there", "what can you do?", "explain webhooks", "how do I learn python?",
+             "summarize the plot of hamlet", "what's the capital of australia?"]
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda pct: values[min(len(values) - 1, int(len(values) * pct / 100))]
+    return {"p50": pick(50), "p90": pick(90), "p99": pick(99), "max": values[-1], "count": len(values)}
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Synthetic stream: `count` updates from `users` users with exponential gaps
+# averaging `rate` updates/sec. Each item is (offset seconds, update dict).
+def synthetic_stream(count, users, rate, seed=1):
+    rng = random.Random(seed)
+    kinds, weights = list(MIX), list(MIX.values())
+    offset = 0.0
+    stream = []
+    for update_id in range(1, count + 1):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "message":
+            text = rng.choice(QUESTIONS)
+        elif kind in ("joke", "story"):
+            text = f"tell me a {kind}"
+        else:
+            text = kind
+        stream.append((offset, update_json(update_id, rng.randrange(1, users + 1), text)))
+        offset += rng.expovariate(rate) if rate else 0.0
+    return stream
+
+
+# Recorded stream: one update JSON per line, as sent by Telegram. An optional
+# "_t" field holds the arrival time in seconds; otherwise updates arrive at `rate`.
+def load_stream(path, rate):
+    stream = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if line.strip():
+                data = json.loads(line)
+                offset = data.pop("_t", None)
+                stream.append((offset if offset is not None else (i / rate if rate else 0.0), data))
+    return stream
+
+
+def save_stream(path, stream):
+    with open(path, "w", encoding="utf-8") as f:
+        for offset, data in stream:
+            f.write(json.dumps({**data, "_t": round(offset, 6)}) + "\n")
+
+
+def update_kind(data):
+    text = (data.get("message") or {}).get("text") or ""
+    if text.startswith("/"):
+        return text.split()[0]
+    return main.intents.classify(text) or "message"
+
+
+# Samples how late a `interval` sleep wakes up; a blocked loop shows up as lag
+class LoopLagMonitor:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def stop(self):
+        self._task.cancel()
+
+
+def configure(args):
+    groq = FakeAsyncGroq(
+        latency=args.groq_latency, jitter=args.groq_jitter, answer_words=args.answer_words,
+        token_interval=args.token_interval, error_rate=args.groq_errors, rate_limit=args.groq_rate_limit,
+    )
+    main.llm_client = LLMClient(groq, max_concurrency=main.MAX_CONCURRENT_AI, timeout=main.AI_TIMEOUT)
+    main.summarizer.llm_client = main.llm_client
+    main.model_router = ModelRouter(main.AVAILABLE_MODELS, small=main.SMALL_MODEL, large=main.LARGE_MODEL,
+                                    long_prompt_tokens=main.LONG_PROMPT_TOKENS)
+    main.history_store = main.new_history_store()
+    main.summarizer.history_store = main.history_store
+    main.background = BackgroundTasks()
+    main.rate_limiter = RateLimiter(main.USER_RATE, main.USER_BURST, main.GLOBAL_RATE, main.GLOBAL_BURST)
+    main.RATE_LIMITS = args.rate_limits
+    main.STREAM_REPLIES = not args.no_stream
+    main.THINKING_STICKER = not args.no_sticker
+    return groq
+
+
+async def run(stream, args):
+    api = FakeBotAPI(api_latency=args.api_latency, error_rate=args.api_errors).start()
+    groq = configure(args)
+    errors_before = dict(metrics.errors._values)
+    app = main.build_application(token="123:FAKE", base_url=api.base_url)
+    await app.initialize()
+    await app.start()
+
+    latencies = {}
+    failures = 0
+    lag = LoopLagMonitor()
+    lag.start()
+    rss_start = rss_bytes()
+    peak_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    async def handle(data):
+        nonlocal failures
+        update = Update.de_json(data, app.bot)
+        started = time.perf_counter()
+        try:
+            await app.update_processor.process_update(update, app.process_update(update))
+        except Exception:
+            failures += 1
+        latencies.setdefault(update_kind(data), []).append(time.perf_counter() - started)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks = []
+    for offset, data in stream:
+        delay = started + offset / args.speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(handle(data)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+    await main.background.drain()
+
+    lag.stop()
+    rss_end = rss_bytes()
+    await app.stop()
+    await app.post_stop(app)
+    await app.shutdown()
+    telegram_calls = api.calls()
+    api.stop()
+
+    everything = [value for values in latencies.values() for value in values]
+    errors = {
+        stage[0]: count - errors_before.get(stage, 0)
+        for stage, count in metrics.errors._values.items() if count != errors_before.get(stage, 0)
+    }
+    return {
+        "config": vars(args),
+        "updates": len(stream),
+        "elapsed": elapsed,
+        "throughput": len(stream) / elapsed if elapsed else None,
+        "latency": {"all": percentiles(everything), **{k: percentiles(v) for k, v in sorted(latencies.items())}},
+        "loop_lag": percentiles(lag.samples),
+        "memory": {
+            "rss_start": rss_start,
+            "rss_end": rss_end,
+            "growth": rss_end - rss_start,
+            "peak_growth": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_start) * 1024,
+        },
+        "errors": {"handler_failures": failures, **errors},
+        "telegram_calls": telegram_calls,
+        "groq": {"calls": groq.calls, "failed": groq.failed, "throttled": groq.throttled},
+    }
+
+
+def report(result):
+    ms = lambda seconds: f"{seconds * 1000:8.1f}"
+    print(f"{result['updates']} updates in {result['elapsed']:.2f} s ({result['throughput']:.1f} updates/s)")
+    print(f"{'latency ms':<12} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'count':>7}")
+    for kind, stats in result["latency"].items():
+        if stats:
+            print(f"{kind:<12} {ms(stats['p50'])} {ms(stats['p90'])} {ms(stats['p99'])} {ms(stats['max'])} {stats['count']:>7}")
+    lag = result["loop_lag"]
+    if lag:
+        print(f"{'loop lag':<12} {ms(lag['p50'])} {ms(lag['p90'])} {ms(lag['p99'])} {ms(lag['max'])}")
+    memory = result["memory"]
+    print(f"memory: rss {memory['rss_start'] / 2**20:.1f} -> {memory['rss_end'] / 2**20:.1f} MiB "
+          f"(growth {memory['growth'] / 2**20:+.1f} MiB, peak +{memory['peak_growth'] / 2**20:.1f} MiB)")
+    print(f"errors: {result['errors']}")
+    print(f"telegram calls: {result['telegram_calls']}")
+    print(f"groq: {result['groq']}")
+
+
+# Headline numbers of `result` next to `baseline`; lower is better except throughput
+def compare(result, baseline):
+    rows = [
+        ("throughput (updates/s)", lambda r: r["throughput"], True),
+        ("latency p50 (ms)", lambda r: r["latency"]["all"]["p50"] * 1000, False),
+        ("latency p99 (ms)", lambda r: r["latency"]["all"]["p99"] * 1000, False),
+        ("loop lag p99 (ms)", lambda r: r["loop_lag"]["p99"] * 1000, False),
+        ("memory growth (MiB)", lambda r: r["memory"]["growth"] / 2**20, False),
+        ("handler failures", lambda r: r["errors"]["handler_failures"], False),
+    ]
+    print(f"{'':<24} {'baseline':>10} {'this run':>10} {'change':>8}")
+    for name, value, higher_is_better in rows:
+        try:
+            old, new = value(baseline), value(result)
+        except (KeyError, TypeError):
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = (change > 0) == higher_is_better if change else None
+        verdict = "" if better is None else ("better" if better else "worse")
+        print(f"{name:<24} {old:>10.1f} {new:>10.1f} {change:>+7.1f}% {verdict}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    source = parser.add_argument_group("update stream")
+    source.add_argument("--updates", type=int, default=1000, help="synthetic updates")
+    source.add_argument("--users", type=int, default=500)
+    source.add_argument("--rate", type=float, default=100, help="arrivals/sec (0 = all at once)")
+    source.add_argument("--seed", type=int, default=1)
+    source.add_argument("--replay", help="replay a recorded stream (JSON lines of updates)")
+    source.add_argument("--record", help="save the stream that is run as JSON lines")
+    source.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    upstream = parser.add_argument_group("fakes")
+    upstream.add_argument("--groq-latency", type=float, default=0.3, help="time to first token (s)")
+    upstream.add_argument("--groq-jitter", type=float, default=0.1)
+    upstream.add_argument("--answer-words", type=int, default=30)
+    upstream.add_argument("--token-interval", type=float, default=0.01)
+    upstream.add_argument("--groq-errors", type=float, default=0.0, help="share of Groq calls failing")
+    upstream.add_argument("--groq-rate-limit", type=int, default=None, help="Groq calls/sec before 429")
+    upstream.add_argument("--api-latency", type=float, default=0.0, help="Bot API round trip (s)")
+    upstream.add_argument("--api-errors", type=float, default=0.0, help="share of Bot API calls failing")
+    bot = parser.add_argument_group("bot settings")
+    bot.add_argument("--rate-limits", action="store_true", help="keep admission control on")
+    bot.add_argument("--no-stream", action="store_true")
+    bot.add_argument("--no-sticker", action="store_true")
+    output = parser.add_argument_group("output")
+    output.add_argument("--save", help="write the result as JSON")
+    output.add_argument("--compare", help="compare with a saved result")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    stream = load_stream(args.replay, args.rate) if args.replay else \
+        synthetic_stream(args.updates, args.users, args.rate, args.seed)
+    if args.record:
+        save_stream(args.record, stream)
+
+    result = asyncio.run(run(stream, args))
+    report(result)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print()
+            compare(result, json.load(f))
@@ -0,0 +1,27 @@
+import time
+
+from telegram.request import HTTPXRequest
+
+import metrics
+
+
+telegram_latency = metrics.Histogram(
+    "bot_telegram_request_seconds", "Bot API call latency by method", ["method"]
+)
+
+
+# HTTPXRequest that times every Bot API call and counts failed ones.
+class TimedRequest(HTTPXRequest):
+    async def do_request(self, url, method, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            metrics.errors.inc("telegram")
+            raise
+        finally:
+            telegram_latency.observe(time.perf_counter() - started, api_method)
+        if code >= 400:
+            metrics.errors.inc("telegram")
+        return code, payload
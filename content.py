@@ -0,0 +1,155 @@
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "content.json")
+
+_ASIDE = re.compile(r"\([^)]*\)")
+_WORD = re.compile(r"[a-z0-9]+")
+# Words that say nothing about which joke or story it is
+_STOPWORDS = frozenset("""
+a an the and or but so to of in on at for with by from as is are was were be been it its it's
+i you he she they we me him her them his my your their our this that there what why how who
+do does did don't didn't can can't could would will not no because when then just go goes went
+get got one all up out if than too very s t re ll d
+""".split())
+
+
+def _content_words(text):
+    words = _WORD.findall(_ASIDE.sub(" ", text.lower()))
+    return frozenset(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words if w not in _STOPWORDS)
+
+
+# Drops exact and near-duplicate entries, keeping the first of each group.
+# Two entries are near-duplicates when most of the content words of the shorter
+# one also appear in the other (asides in parentheses are ignored).
+def dedupe(items, threshold=0.6):
+    kept = []
+    kept_words = []
+    for item in items:
+        words = _content_words(item)
+        duplicate = any(
+            words == other or (words and other and len(words & other) / min(len(words), len(other)) >= threshold)
+            for other in kept_words
+        )
+        if not duplicate:
+            kept.append(item)
+            kept_words.append(words)
+    return kept
+
+
+# Items served without repeats per user: each user walks a random permutation
+# of all items before any item comes back. The permutation is affine,
+# i -> (a * i + b) mod n with a coprime to n, so a user's whole state is one
+# int packing (a, b, position) and every pick is O(1).
+class ContentSet:
+    def __init__(self, items, max_users=100_000):
+        self.items = list(items)
+        self.max_users = max_users
+        n = len(self.items)
+        self._multipliers = [a for a in range(1, n) if math.gcd(a, n) == 1] or [1]
+        self._states = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def _new_cycle(self, avoid=None):
+        n = len(self.items)
+        a = random.choice(self._multipliers)
+        b = random.randrange(n)
+        if b == avoid and n > 1:
+            b = (b + 1) % n        # the first pick of a new cycle is never the last one shown
+        return a, b
+
+    def pick(self, user_id=None):
+        n = len(self.items)
+        if user_id is None or n == 1:
+            return random.choice(self.items)
+
+        state = self._states.get(user_id)
+        if state is None:
+            a, b = self._new_cycle()
+            position = 0
+            if len(self._states) >= self.max_users:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(user_id)
+            cycle, position = divmod(state, n)
+            a, b = divmod(cycle, n)
+        index = (a * position + b) % n
+        position += 1
+        if position == n:
+            a, b = self._new_cycle(avoid=index)
+            position = 0
+        self._states[user_id] = (a * n + b) * n + position
+        return self.items[index]
+
+
+# Jokes and stories loaded once from a JSON data file ({"jokes": [...],
+# "stories": [...]}). The file's mtime is checked at most every
+# `check_interval` seconds and a changed file is reloaded in place; users
+# then start fresh no-repeat cycles over the new items.
+class ContentLibrary:
+    def __init__(self, path=DATA_PATH, check_interval=5.0, max_users=100_000, preload=True):
+        self.path = path
+        self.check_interval = check_interval
+        self.max_users = max_users
+        self.reloads = 0
+        self.duplicates = 0
+        self.jokes = None
+        self.stories = None
+        self._mtime = None
+        self._checked = 0.0
+        if preload:
+            self.load()
+
+    def load(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        jokes = dedupe(data["jokes"])
+        stories = dedupe(data["stories"])
+        self.duplicates = len(data["jokes"]) - len(jokes) + len(data["stories"]) - len(stories)
+        self.jokes = ContentSet(jokes, self.max_users)
+        self.stories = ContentSet(stories, self.max_users)
+        self._mtime = mtime
+
+    def maybe_reload(self):
+        if self.jokes is None:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            if os.stat(self.path).st_mtime != self._mtime:
+                self.load()
+                self.reloads += 1
+        except (OSError, ValueError, KeyError):
+            pass        # keep serving the old content until the file is valid again
+
+    def joke(self, user_id=None):
+        self.maybe_reload()
+        return self.jokes.pick(user_id)
+
+    def story(self, user_id=None):
+        self.maybe_reload()
+        return self.stories.pick(user_id)
+
+    def stats(self):
+        return {
+            "jokes": len(self.jokes) if self.jokes is not None else 0,
+            "stories": len(self.stories) if self.stories is not None else 0,
+            "duplicates": self.duplicates,
+            "reloads": self.reloads,
+        }
+
+
+# Loaded on the first joke or story (or by main's warm-up), not at import
+library = ContentLibrary(preload=False)
@@ -0,0 +1,66 @@
+MESSAGE_OVERHEAD = 4    # role/formatting tokens added per chat message
+
+
+# Cheap token estimate (~4 characters per token for English text).
+# Counted once per message when it is appended, never recounted.
+def estimate_tokens(text):
+    return len(text) // 4 + MESSAGE_OVERHEAD
+
+
+# Chat history for one user with a running token total.
+class Conversation:
+    __slots__ = ("max_messages", "max_tokens", "messages", "token_counts", "total_tokens", "total_chars")
+
+    def __init__(self, max_messages=100, max_tokens=None):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.messages = []
+        self.token_counts = []
+        self.total_tokens = 0
+        self.total_chars = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def append(self, role, content):
+        tokens = estimate_tokens(content)
+        self.messages.append({"role": role, "content": content})
+        self.token_counts.append(tokens)
+        self.total_tokens += tokens
+        self.total_chars += len(content)
+
+        # Drop the oldest turns once over the message cap or the largest budget
+        while len(self.messages) > 1 and (
+            len(self.messages) > self.max_messages
+            or (self.max_tokens is not None and self.total_tokens > self.max_tokens)
+        ):
+            self.total_chars -= len(self.messages.pop(0)["content"])
+            self.total_tokens -= self.token_counts.pop(0)
+
+    def clear(self):
+        self.messages.clear()
+        self.token_counts.clear()
+        self.total_tokens = 0
+        self.total_chars = 0
+
+    # Replace the oldest messages with one summary message, provided `prefix` is
+    # still the start of the conversation (it may have changed in the meantime)
+    def replace_prefix(self, prefix, summary):
+        count = len(prefix)
+        if count > len(self.messages) or any(a is not b for a, b in zip(self.messages, prefix)):
+            return False
+        tokens = estimate_tokens(summary)
+        self.total_tokens += tokens - sum(self.token_counts[:count])
+        self.total_chars += len(summary) - sum(len(m["content"]) for m in prefix)
+        self.messages[:count] = [{"role": "system", "content": summary}]
+        self.token_counts[:count] = [tokens]
+        return True
+
+    # Newest messages that fit in `budget` tokens -> (messages, prompt_tokens)
+    def window(self, budget):
+        tokens = self.total_tokens
+        start = 0
+        while tokens > budget and start < len(self.messages) - 1:
+            tokens -= self.token_counts[start]
+            start += 1
+        return self.messages[start:], tokens
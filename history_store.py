@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+MESSAGE_BYTES = 120     # rough per-message overhead (dict + deque slot) on top of the text
+
+
+# Interface used by the handlers to load and persist conversations.
+# get() always returns a Conversation (a fresh one for unknown users);
+# call save() after mutating it so the store can account for it.
+class HistoryStore:
+    def __init__(self, conversation_factory):
+        self.conversation_factory = conversation_factory
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def save(self, user_id, conversation):
+        raise NotImplementedError
+
+    def clear(self, user_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def conversation_bytes(conversation):
+    return conversation.total_chars + MESSAGE_BYTES * len(conversation)
+
+
+# In-memory store bounded by user count and approximate bytes,
+# evicting least recently used users first and users idle for idle_ttl seconds.
+class MemoryHistoryStore(HistoryStore):
+    def __init__(self, conversation_factory, max_users=100_000, max_bytes=256 * 1024 * 1024, idle_ttl=24 * 3600):
+        super().__init__(conversation_factory)
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.total_bytes = 0
+        self.evictions = 0
+        # user_id -> [conversation, size in bytes, last access], oldest first
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    def get(self, user_id):
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            conversation = self.conversation_factory()
+            self._insert(user_id, conversation, now)
+            return conversation
+        entry[2] = now
+        self._entries.move_to_end(user_id)
+        return entry[0]
+
+    def save(self, user_id, conversation):
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self._insert(user_id, conversation, now)
+            return
+        size = conversation_bytes(conversation)
+        self.total_bytes += size - entry[1]
+        entry[0], entry[1], entry[2] = conversation, size, now
+        self._entries.move_to_end(user_id)
+        self._evict()
+
+    def clear(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def _insert(self, user_id, conversation, now):
+        size = conversation_bytes(conversation)
+        self._entries[user_id] = [conversation, size, now]
+        self.total_bytes += size
+        self._evict()
+
+    def _pop_oldest(self):
+        _, entry = self._entries.popitem(last=False)
+        self.total_bytes -= entry[1]
+        self.evictions += 1
+
+    def _evict(self):
+        while len(self._entries) > 1 and (len(self._entries) > self.max_users or self.total_bytes > self.max_bytes):
+            self._pop_oldest()
+
+    def _expire(self, now):
+        # entries are in access order, so idle users are always at the front
+        if self.idle_ttl is None:
+            return
+        deadline = now - self.idle_ttl
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry[2] >= deadline:
+                break
+            self._pop_oldest()
+
+
+# SQLite-backed store that survives restarts. Recently used conversations stay
+# in a bounded MemoryHistoryStore cache; changes are written in batches, at the
+# latest flush_interval seconds after they are made. Inside an event loop a
+# batch is written by a thread (on its own connection) so the loop keeps
+# serving; without one, or on close(), it is written right away.
+class SQLiteHistoryStore(HistoryStore):
+    def __init__(self, conversation_factory, path="history.db", cache_users=10_000,
+                 batch_size=500, flush_interval=2.0, idle_ttl=30 * 24 * 3600):
+        super().__init__(conversation_factory)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.idle_ttl = idle_ttl
+        self.cache = MemoryHistoryStore(conversation_factory, max_users=cache_users, idle_ttl=None)
+        self.writes = 0
+        self.write_errors = 0
+        self._dirty = {}        # user_id -> conversation waiting to be written
+        self._deleted = set()
+        self._writing = {}      # the batch being written: user_id -> messages
+        self._deleting = set()
+        self._flushing = None   # task writing the batch
+        self._timer = None      # flushes pending changes when traffic goes quiet
+        self._closed = False
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "user_id INTEGER PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS history_updated_at ON history (updated_at)")
+        self.db.commit()
+        self.users = self.db.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+
+    # users stored as of the last batch written
+    def __len__(self):
+        return self.users
+
+    def get(self, user_id):
+        if user_id in self.cache:
+            return self.cache.get(user_id)
+        conversation = self._dirty.get(user_id)
+        if conversation is None:
+            conversation = self._load(user_id)
+        self.cache.save(user_id, conversation)
+        return conversation
+
+    def save(self, user_id, conversation):
+        self.cache.save(user_id, conversation)
+        self._deleted.discard(user_id)
+        self._dirty[user_id] = conversation
+        self._changed()
+
+    def clear(self, user_id):
+        self.cache.clear(user_id)
+        self._dirty.pop(user_id, None)
+        self._deleted.add(user_id)
+        self._changed()
+
+    def _changed(self):
+        if len(self._dirty) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._schedule_flush()
+        else:
+            self._arm_timer()
+
+    # Without a running loop the changes wait for the next save() or close()
+    def _arm_timer(self):
+        if self._timer is not None or self._closed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.flush_interval, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flushing is not None or self._closed:
+            return          # the timer is armed again when it finishes
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flushing = loop.create_task(self._flush_in_thread())
+
+    # Takes the pending changes as a batch. Messages are copied here, on the
+    # caller's thread, since handlers keep appending to them.
+    def _take_batch(self):
+        writing = {user_id: list(c.messages) for user_id, c in self._dirty.items()}
+        deleting = self._deleted
+        self._dirty = {}
+        self._deleted = set()
+        self._last_flush = time.monotonic()
+        return writing, deleting
+
+    async def _flush_in_thread(self):
+        # get() reads the batch from here until it is in the database
+        self._writing, self._deleting = self._take_batch()
+        try:
+            await asyncio.to_thread(self._write, self._writing, self._deleting)
+        except Exception as e:
+            # keep the batch for the next flush unless it changed meanwhile
+            self.write_errors += 1
+            log.error("history_flush_failed users=%d error=%r", len(self._writing), e)
+            for user_id in self._deleting - self._dirty.keys():
+                self._deleted.add(user_id)
+            for user_id, messages in self._writing.items():
+                if user_id not in self._dirty and user_id not in self._deleted:
+                    self._dirty[user_id] = self._restore(messages)
+        finally:
+            self._writing = {}
+            self._deleting = set()
+            self._flushing = None
+            if self._dirty or self._deleted:
+                self._arm_timer()
+
+    def flush(self):
+        self._write(*self._take_batch())
+
+    # Runs in a worker thread when called from _flush_in_thread
+    def _write(self, writing, deleting):
+        with self._lock:
+            if self._writer is None:
+                return
+            try:
+                now = time.time()
+                if writing:
+                    self._writer.executemany(
+                        "INSERT OR REPLACE INTO history (user_id, messages, updated_at) VALUES (?, ?, ?)",
+                        [(user_id, json.dumps(messages), now) for user_id, messages in writing.items()],
+                    )
+                if deleting:
+                    self._writer.executemany("DELETE FROM history WHERE user_id = ?", [(u,) for u in deleting])
+                if self.idle_ttl is not None:
+                    self._writer.execute("DELETE FROM history WHERE updated_at < ?", (now - self.idle_ttl,))
+                self._writer.commit()
+                self.writes += len(writing)
+                self.users = self._writer.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    # A pending flush task is cancelled and its batch written here, in order,
+    # before the rest; a thread still holding the batch then finds the writer
+    # closed and skips it
+    def close(self):
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None:
+            self._flushing.cancel()
+            self._flushing = None
+            self._write(self._writing, self._deleting)
+        self.flush()
+        with self._lock:
+            self._writer.close()
+            self._writer = None
+        self.db.close()
+
+    def _restore(self, messages):
+        conversation = self.conversation_factory()
+        for message in messages:
+            conversation.append(message["role"], message["content"])
+        return conversation
+
+    def _load(self, user_id):
+        if user_id in self._deleted or user_id in self._deleting:
+            return self.conversation_factory()
+        if user_id in self._writing:
+            return self._restore(self._writing[user_id])
+        row = self.db.execute("SELECT messages FROM history WHERE user_id = ?", (user_id,)).fetchone()
+        return self._restore(json.loads(row[0]) if row is not None else [])
@@ -0,0 +1,98 @@
+import re
+
+import metrics
+
+
+intent_matches = metrics.Counter("bot_intents_total", "Messages answered by a local intent", ["intent"])
+
+# Building blocks for "give me a <thing>" style requests. A message is only an
+# intent when the whole message is such a request, so "tell me about the
+# history of jokes" or "write a story about my cat" still go to the AI.
+_LEAD = r"(?:(?:hey|hi|ok|okay|so|now|please|pls|plz|bot)[\s,!.]+)*"
+_ASK = (
+    r"(?:(?:can|could|would|will)\s+(?:you|u)\s+(?:please\s+)?"
+    r"|i(?:\s+(?:want|need|would\s+like|wanna)|['’]d\s+like)\s+(?:to\s+(?:hear|read)\s+)?"
+    r"|(?:let\s+me\s+hear|gimme)\s+)?"
+)
+_VERB = r"(?:hit\s+me\s+with\s+|(?:tell|give|share|say|send|crack|read)\s+(?:(?:me|us)\s+)?)?"
+_DET = r"(?:(?:a|an|another|one|some|more|any|one\s+more|your|ur|the)\s+)?"
+_TAIL = r"(?:[\s,]+(?:please|pls|plz|now|again|then|bro|buddy|mate|man|sir|today|too|thanks))*\W*"
+
+
+def request_pattern(nouns, adjectives=()):
+    adjective = r"(?:(?:%s)\s+){0,2}" % "|".join(adjectives) if adjectives else ""
+    return _LEAD + _ASK + _VERB + _DET + adjective + "(?:%s)" % "|".join(nouns) + _TAIL
+
+
+def know_any_pattern(nouns):
+    return (_LEAD + r"(?:(?:do|did)\s+)?(?:(?:you|u)\s+)?(?:know|have|got)\s+(?:any|a|some)\s+"
+            r"(?:(?:good|funny|new|more|other)\s+)?(?:%s)" % "|".join(nouns) + _TAIL)
+
+
+JOKE_PATTERNS = [
+    request_pattern(
+        [r"jokes?", r"joke\s+time", r"puns?"],
+        ["funny", "good", "short", "dad", "bad", "silly", "corny", "lame", "new", "random", "quick",
+         "great", "nice", "cool", "clean", "programming", r"knock[\s-]knock", "other"],
+    ),
+    know_any_pattern([r"jokes?", r"puns?"]),
+    _LEAD + _ASK + r"(?:make\s+me\s+(?:laugh|smile)|(?:say|tell\s+me)\s+something\s+funny|cheer\s+me\s+up)" + _TAIL,
+]
+
+STORY_PATTERNS = [
+    request_pattern(
+        [r"stor(?:y|ies)", r"story\s+time", r"tales?"],
+        ["short", "bedtime", "sad", "funny", "love", "scary", "happy", "little", "quick", "new", "random",
+         "good", "inspiring", "motivational", "tiny", "nice", "cool", "deep", "other"],
+    ),
+    know_any_pattern([r"stor(?:y|ies)", r"tales?"]),
+]
+
+
+# Local intents: each has regex patterns and a responder(user_id) -> reply text.
+# All patterns are compiled into one alternation of named groups, so a message
+# is classified with a single case-insensitive fullmatch. Compiling takes tens
+# of milliseconds, so it happens on the first classify(), not on register().
+class IntentRouter:
+    def __init__(self, max_length=200):
+        self.max_length = max_length
+        self._intents = {}
+        self._pattern = None
+        self._stale = False
+
+    def register(self, name, patterns, responder):
+        if not name.isidentifier():
+            raise ValueError(f"intent name must be an identifier: {name!r}")
+        self._intents[name] = (list(patterns), responder)
+        self._stale = True
+
+    def _compile(self):
+        groups = [
+            "(?P<%s>%s)" % (name, "|".join("(?:%s)" % p for p in patterns))
+            for name, (patterns, _) in self._intents.items()
+        ]
+        self._pattern = re.compile(r"\s*(?:%s)" % "|".join(groups), re.IGNORECASE) if groups else None
+        self._stale = False
+
+    def classify(self, text):
+        if self._stale:
+            self._compile()
+        if self._pattern is None or len(text) > self.max_length:
+            return None
+        match = self._pattern.fullmatch(text)
+        return match.lastgroup if match else None
+
+    # Reply for a local intent, or None when the message should go to the AI
+    def respond(self, text, user_id=None):
+        name = self.classify(text)
+        if name is None:
+            return None
+        intent_matches.inc(name)
+        return self._intents[name][1](user_id)
+
+
+intents = IntentRouter()
+
+
+def register_intent(name, patterns, responder):
+    intents.register(name, patterns, responder)
@@ -0,0 +1,231 @@
+import asyncio
+import functools
+import sys
+import time
+
+import metrics
+from rate_limit import FairLimiter
+
+
+llm_latency = metrics.Histogram(
+    "bot_llm_request_seconds", "Groq call latency by model, from leaving the queue to the last token", ["model"]
+)
+llm_first_token = metrics.Histogram(
+    "bot_llm_first_token_seconds", "Time to the first streamed token by model", ["model"]
+)
+
+
+# Async completion layer in front of the Groq client.
+# Accepts either groq.AsyncGroq (awaited directly) or the sync groq.Groq
+# (run on the default executor) so a slow completion never blocks the loop.
+# Slots are shared fairly between callers by `key` (the user id), and upstream
+# 429s pause every call to that model until the server's retry-after has passed.
+# A call waits out a pause of up to `max_blocked_wait` seconds before taking a
+# slot; a longer one raises ModelThrottled at once, so the caller can try
+# another model instead of holding a slot.
+# Instead of a client, `client_factory` may build it on first use.
+class LLMClient:
+    def __init__(self, client=None, max_concurrency=32, timeout=60.0, max_retries=2, client_factory=None,
+                 max_blocked_wait=1.0):
+        self._client = client
+        self.client_factory = client_factory
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_blocked_wait = max_blocked_wait
+        self._limiter = FairLimiter(max_concurrency)
+        self._blocked_until = {}    # model -> loop time when 429 backoff ends
+
+        # queue-depth / throughput counters
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.blocked = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    @property
+    def waiting(self):
+        return self._limiter.waiting
+
+    # Before taking a slot, so a paused model holds none
+    async def _wait_unblocked(self, model):
+        delay = self._blocked_until.get(model, 0.0) - asyncio.get_running_loop().time()
+        if delay > self.max_blocked_wait:
+            self.blocked += 1
+            raise ModelThrottled(model, delay)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _acquire(self, key):
+        if self._limiter.locked():
+            self.max_waiting = max(self.max_waiting, self.waiting + 1)
+        await self._limiter.acquire(key)
+
+    # Extra keyword arguments (e.g. max_tokens) are passed to the Groq API.
+    # `on_first_token(seconds)`, if given, is called with the time from leaving
+    # the queue to the first token (for a completion, to the whole reply).
+    async def complete(self, messages, model, key=None, on_first_token=None, **kwargs):
+        await self._wait_unblocked(model)
+        await self._acquire(key)
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            chat_completion = await asyncio.wait_for(
+                self._create_with_retry(messages, model, **kwargs), self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            metrics.errors.inc("llm")
+            raise
+        except Exception:
+            self.errors += 1
+            metrics.errors.inc("llm")
+            raise
+        finally:
+            self.in_flight -= 1
+            self._limiter.release()
+
+        self.completed += 1
+        elapsed = time.perf_counter() - started
+        llm_latency.observe(elapsed, model)
+        if on_first_token is not None:
+            on_first_token(elapsed)
+        usage = getattr(chat_completion, "usage", None)
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens
+        return chat_completion.choices[0].message.content
+
+    # Yields the reply as text deltas. The timeout covers the whole stream.
+    # Sync clients cannot stream, so they yield the full completion once.
+    async def stream(self, messages, model, key=None, on_first_token=None):
+        if not asyncio.iscoroutinefunction(self.client.chat.completions.create):
+            yield await self.complete(messages, model, key=key, on_first_token=on_first_token)
+            return
+
+        await self._wait_unblocked(model)
+        await self._acquire(key)
+        self.in_flight += 1
+        started = time.perf_counter()
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        response = None
+        first = True
+        try:
+            response = await asyncio.wait_for(
+                self._create_with_retry(messages, model, stream=True), self.timeout
+            )
+            chunks = response.__aiter__()
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(remaining, 0))
+                except StopAsyncIteration:
+                    break
+                # Groq reports usage on the last chunk, under x_groq
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    self.prompt_tokens += usage.prompt_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first:
+                        first = False
+                        elapsed = time.perf_counter() - started
+                        llm_first_token.observe(elapsed, model)
+                        if on_first_token is not None:
+                            on_first_token(elapsed)
+                    yield chunk.choices[0].delta.content
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            metrics.errors.inc("llm")
+            raise
+        except Exception:
+            self.errors += 1
+            metrics.errors.inc("llm")
+            raise
+        finally:
+            self.in_flight -= 1
+            self._limiter.release()
+            if response is not None:
+                await response.close()
+
+        self.completed += 1
+        llm_latency.observe(time.perf_counter() - started, model)
+
+    # A retry waits in the caller's slot, so only pauses up to max_blocked_wait
+    # are retried; after a longer one the 429 is raised
+    async def _create_with_retry(self, messages, model, **kwargs):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._create(messages, model, **kwargs)
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429:
+                    raise
+                self.throttled += 1
+                self._blocked_until[model] = max(self._blocked_until.get(model, 0.0), loop.time() + retry_after(e, attempt))
+                delay = self._blocked_until[model] - loop.time()
+                if attempt == self.max_retries or delay > self.max_blocked_wait:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def _create(self, messages, model, **kwargs):
+        create = self.client.chat.completions.create
+        if asyncio.iscoroutinefunction(create):
+            return await create(messages=messages, model=model, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(create, messages=messages, model=model, **kwargs))
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "throttled": self.throttled,
+            "blocked": self.blocked,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+        }
+
+
+# Raised when `model` is paused after a 429 for `delay` more seconds. Carries
+# the 429 status code like Groq's RateLimitError.
+class ModelThrottled(Exception):
+    status_code = 429
+
+    def __init__(self, model, delay):
+        super().__init__(f"{model} is rate limited for {delay:.1f}s")
+        self.model = model
+        self.delay = delay
+
+
+# True for failures of the model call itself (Groq API errors, 429 pauses and
+# timeouts), as opposed to errors around it, e.g. sending the reply to Telegram
+def is_upstream_error(error):
+    if isinstance(error, (asyncio.TimeoutError, ModelThrottled)):
+        return True
+    groq = sys.modules.get("groq")      # imported with the client, if at all
+    return groq is not None and isinstance(error, groq.APIError)
+
+
+# Seconds to back off after a 429: the server's retry-after header when
+# present, otherwise exponential from 1s.
+def retry_after(error, attempt):
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            pass
+    return min(30.0, 2.0 ** attempt)
@@ -0,0 +1,56 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+
+# Keeps at most `max_per_second` records below `always_level` each second and
+# then one in `sample_every`, so a burst of traffic cannot flood the log.
+class LogSampler(logging.Filter):
+    def __init__(self, max_per_second=50, sample_every=100, always_level=logging.ERROR):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self.sample_every = sample_every
+        self.always_level = always_level
+        self.window = 0
+        self.count = 0
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno >= self.always_level:
+            return True
+        now = int(time.monotonic())
+        if now != self.window:
+            self.window = now
+            self.count = 0
+        self.count += 1
+        if self.count <= self.max_per_second or self.count % self.sample_every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+
+sampler = LogSampler()
+
+
+# Routes every log record through a queue to a stdout writer thread, so the
+# event loop never blocks on the terminal. Messages are "event key=value ...".
+# Returns the listener; stop() it on exit to flush.
+def setup_logging(level="INFO", max_per_second=50, sample_every=100):
+    sampler.max_per_second = max_per_second
+    sampler.sample_every = sample_every
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(sampler)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+    return listener
@@ -0,0 +1,180 @@
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import metrics
+
+
+log = logging.getLogger(__name__)
+
+loop_lag = metrics.Histogram(
+    "bot_loop_lag_seconds", "Event loop lag (late heartbeats)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+loop_stalls = metrics.Counter("bot_loop_stalls_total", "Event loop stalls past the watchdog threshold", ["handler"])
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# Frames of a thread's stack, outermost first
+def _stack(frame, limit=64):
+    names = []
+    while frame is not None and len(names) < limit:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def _idle(frame):
+    return frame is not None and os.path.basename(frame.f_code.co_filename) == "selectors.py"
+
+
+# Watches the event loop from a separate thread. A heartbeat task wakes every
+# `interval` seconds; when it has not run for `threshold` seconds, the loop is
+# stuck in blocking code, so the watchdog thread logs the loop thread's stack
+# and the handler/update the running task belongs to (see track()).
+# The same thread machinery takes sampling profiles of the loop on demand.
+class Watchdog:
+    def __init__(self, threshold=0.25, interval=0.05, keep=20):
+        self.threshold = threshold
+        self.interval = interval
+        self.labels = {}        # task -> (handler, "update=... user=...")
+        self.recent = deque(maxlen=keep)
+        self.stalls = 0
+        self.profiles = 0
+        self._loop = None
+        self._thread_id = None
+        self._beat = 0.0
+        self._heartbeat = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self._profiling = threading.Lock()
+
+    # Must run on the event loop; stall detection only when `detect_stalls`,
+    # profiles work either way
+    def start(self, detect_stalls=True):
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        if not detect_stalls or self._heartbeat is not None:
+            return
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        self._watcher = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watcher.start()
+
+    async def stop(self):
+        if self._heartbeat is None:
+            return
+        self._stop.set()
+        self._heartbeat.cancel()
+        self._heartbeat = None
+        await asyncio.to_thread(self._watcher.join)
+
+    # Labels the current task for stall reports and profiles
+    @contextlib.contextmanager
+    def track(self, handler, detail=""):
+        task = asyncio.current_task()
+        self.labels[task] = (handler, detail)
+        try:
+            yield
+        finally:
+            del self.labels[task]
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - self._beat - self.interval)
+            previous, self._beat = self._beat, now
+            loop_lag.observe(lag)
+            if lag >= self.threshold and self.recent and self.recent[-1]["beat"] == previous:
+                self.recent[-1]["seconds"] = lag
+                log.warning("loop_stall_end seconds=%.3f handler=%s", lag, self.recent[-1]["handler"])
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled >= self.threshold + self.interval and beat != reported:
+                reported = beat
+                self._report(beat, stalled)
+
+    # (handler, detail) of the task the loop is running right now
+    def _running(self):
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "(loop)", ""
+        return self.labels.get(task) or (task.get_name(), "")
+
+    def _report(self, beat, stalled):
+        frame = sys._current_frames().get(self._thread_id)
+        handler, detail = self._running()
+        stack = _stack(frame)
+        self.stalls += 1
+        loop_stalls.inc(handler)
+        self.recent.append({
+            "beat": beat, "time": time.time(), "seconds": stalled,
+            "handler": handler, "detail": detail, "stack": stack,
+        })
+        log.warning("loop_stall seconds=%.3f handler=%s %s at=%s", stalled, handler, detail,
+                    " <- ".join(reversed(stack[-8:])))
+
+    # Samples the loop thread every `interval` seconds for `seconds` and returns
+    # the stacks in folded format ("handler;outer;...;inner count" per line),
+    # ready for flamegraph.pl or speedscope. Idle samples (the loop waiting in
+    # select) are left out unless `idle`. Blocking: run it in a thread.
+    def profile(self, seconds=10.0, interval=0.005, idle=False):
+        if self._thread_id is None:
+            raise RuntimeError("watchdog not started")
+        if not self._profiling.acquire(blocking=False):
+            raise RuntimeError("a profile is already running")
+        try:
+            samples = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(self._thread_id)
+                handler, _ = self._running()
+                if handler == "(loop)" and _idle(frame):
+                    if idle:
+                        samples["(idle)"] += 1
+                else:
+                    samples[";".join([handler, *_stack(frame)])] += 1
+                time.sleep(interval)
+            self.profiles += 1
+            return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+        finally:
+            self._profiling.release()
+
+    # GET /profile?seconds=10&interval=0.005&idle=1 on the metrics server
+    async def profile_route(self, query):
+        seconds = min(float(query.get("seconds", ["10"])[0]), 300.0)
+        interval = max(float(query.get("interval", ["0.005"])[0]), 0.001)
+        idle = query.get("idle", ["0"])[0] not in ("0", "false", "")
+        try:
+            body = await asyncio.to_thread(self.profile, seconds, interval, idle)
+        except RuntimeError as e:
+            return 409, "text/plain", f"{e}\n"
+        return 200, "text/plain", body
+
+    # GET /stalls: the most recent stalls with their stacks, newest first
+    def stalls_route(self, query):
+        lines = []
+        for stall in reversed(self.recent):
+            lines.append(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stall['time']))} "
+                         f"{stall['seconds']:.3f}s {stall['handler']} {stall['detail']}".rstrip())
+            lines.extend(f"    {name}" for name in stall["stack"])
+        return 200, "text/plain", "\n".join(lines) + "\n" if lines else "no stalls\n"
+
+    def stats(self):
+        return {"stalls": self.stalls, "profiles": self.profiles, "tracked": len(self.labels)}
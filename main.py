@@ -1,21 +1,110 @@
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, TypeHandler, filters
 import my_jokes_and_story
+import content
+from intents import intents, register_intent, JOKE_PATTERNS, STORY_PATTERNS
 from telegram import Update, ReactionTypeEmoji, BotCommand
 import asyncio
+import functools
+import logging
 import platform
-import nest_asyncio
-from groq import Groq
+import time
 import reaction
-from collections import defaultdict
+from llm import LLMClient
+from conversation import Conversation
+from history_store import MemoryHistoryStore, SQLiteHistoryStore
+from streaming import ProgressiveReply, reply_in_parts, stream_stats
+from background import BackgroundTasks
+from response_cache import ResponseCache
+from rate_limit import RateLimiter
+from router import ModelRouter
+from summarizer import Summarizer
+from bot_request import TimedRequest
+from scheduler import PriorityUpdateProcessor
+import metrics
+import logs
+import workers
+from loop_watchdog import Watchdog
 
 
 BOT_TOKEN = "BOT_TOKEN"
 GROQ_API_KEY = "GROQ_AP"
 
-
-# Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY)
-conversation_history = defaultdict(list)
+# Webhook mode: set WEBHOOK_URL (public https base URL) to receive updates
+# over HTTP instead of polling
+WEBHOOK_URL = ""
+WEBHOOK_LISTEN = "0.0.0.0"
+WEBHOOK_PORT = 8443
+WEBHOOK_PATH = "telegram"
+WEBHOOK_SECRET = ""         # checked against the X-Telegram-Bot-Api-Secret-Token header
+CONCURRENT_UPDATES = 256    # updates handled at the same time (polling and webhook)
+CONNECTION_POOL_SIZE = 32   # HTTP connections to the Bot API (httpx pool cost grows with size)
+
+# Prometheus-style metrics at http://METRICS_HOST:METRICS_PORT/metrics (0 = off)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9469
+# Logging: records below ERROR are sampled beyond LOG_MAX_PER_SECOND
+LOG_LEVEL = "INFO"
+LOG_MAX_PER_SECOND = 50
+
+# Multi-process mode: with WORKERS > 1 this process only receives updates and
+# forwards each chat to the same worker process (consistent hashing). Set
+# HISTORY_BACKEND = "sqlite" so workers share history and a restarted worker
+# picks its chats up where they were.
+WORKERS = 1
+
+# Event loop watchdog: a stall longer than WATCHDOG_THRESHOLD seconds is logged
+# with the blocking stack and the handler/update it happened in. Sampling
+# profiles of the loop are served at /profile?seconds=10 on the metrics server
+# (folded stacks for flamegraph.pl or speedscope), recent stalls at /stalls.
+WATCHDOG = False
+WATCHDOG_THRESHOLD = 0.25
+
+log = logging.getLogger("bot")
+
+
+# Groq client, built on first use (importing groq alone takes ~0.1 s)
+def new_groq_client():
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=GROQ_API_KEY)
+
+
+MAX_CONCURRENT_AI = 64      # completions in flight per process
+AI_TIMEOUT = 60             # seconds per completion
+llm_client = LLMClient(client_factory=new_groq_client, max_concurrency=MAX_CONCURRENT_AI, timeout=AI_TIMEOUT)
+# Admission control for AI messages: token buckets per user and for the whole bot
+RATE_LIMITS = True
+USER_RATE = 0.5             # sustained AI messages per second per user
+USER_BURST = 5
+GLOBAL_RATE = 20            # sustained AI messages per second overall
+GLOBAL_BURST = 60
+rate_limiter = RateLimiter(USER_RATE, USER_BURST, GLOBAL_RATE, GLOBAL_BURST)
+BUSY_TEXT = "⏳ Too many requests right now. Please try again in a moment."
+# Update scheduling: commands and canned replies go ahead of AI messages. At most
+# MAX_RUNNING_AI AI messages are handled at once and MAX_QUEUED_AI wait; beyond
+# that, or after AI_MAX_WAIT seconds in the queue, the user gets BUSY_TEXT right
+# away. A waiting AI message is dropped (its text kept in the history) when the
+# same user sends a newer one.
+PRIORITY_SCHEDULING = True
+MAX_RUNNING_AI = 192
+MAX_QUEUED_AI = 512
+AI_MAX_WAIT = 30
+STREAM_REPLIES = True       # progressively edit one message while the reply streams in
+STREAM_EDIT_INTERVAL = 1.0  # seconds between edits of a streamed reply
+STREAM_EDIT_MIN_CHARS = 40  # new characters needed before the next edit
+THINKING_STICKER = True     # show a sticker while the AI works
+STICKER_LOAD_LIMIT = 32     # skip the sticker once this many AI calls are in flight or queued
+# Replace this with your sticker file_id after getting it
+THINKING_STICKER_ID = "CAACAgQAAxkBAAEK99dlfC7LDqnuwtGRkIoacot_dGC4zQACbg8AAuHqsVDaMQeY6CcRojME"
+
+# Opt-in cache of AI answers for repeated prompts. Only used while the user has at
+# most RESPONSE_CACHE_MAX_CONTEXT earlier messages (0 = first turn only); those
+# messages are hashed into the key.
+RESPONSE_CACHE = False
+RESPONSE_CACHE_MAX_CONTEXT = 0
+response_cache = ResponseCache(max_entries=5000, ttl=3600)
+
+# Reactions and sticker cleanup run here, after the answer is sent
+background = BackgroundTasks(max_concurrency=32, max_pending=1000)
 MAX_HISTORY = 100
 
 
@@ -24,7 +113,94 @@ AVAILABLE_MODELS = {
     "llama": "llama-3.3-70b-versatile",
     "gemma": "gemma2-9b-it",
 }
-CURRENT_MODEL = "llama"
+
+# Prompt token budget per model (leaves room in the context window for the reply)
+MODEL_TOKEN_BUDGETS = {
+    "llama": 8000,
+    "gemma": 6000,
+}
+
+# Model routing: short prompts go to the small model, long ones to the large one.
+# A failing or much slower model is steered around, and a failed call falls back
+# to the next model. Users can pin a model with /model.
+SMALL_MODEL = "gemma"
+LARGE_MODEL = "llama"
+LONG_PROMPT_TOKENS = 1000
+model_router = ModelRouter(AVAILABLE_MODELS, small=SMALL_MODEL, large=LARGE_MODEL, long_prompt_tokens=LONG_PROMPT_TOKENS)
+user_models = {}            # user id -> model name chosen with /model
+
+# Local intents, answered without calling Groq (add more with register_intent)
+register_intent("joke", JOKE_PATTERNS, my_jokes_and_story.get_my_jokes)
+register_intent("story", STORY_PATTERNS, my_jokes_and_story.story)
+
+
+def new_conversation():
+    return Conversation(max_messages=MAX_HISTORY, max_tokens=max(MODEL_TOKEN_BUDGETS.values()))
+
+
+# Conversation history backend: "memory" (bounded LRU + idle TTL) or "sqlite" (survives restarts)
+HISTORY_BACKEND = "memory"
+HISTORY_DB_PATH = "history.db"
+HISTORY_MAX_USERS = 100_000
+HISTORY_MAX_BYTES = 256 * 1024 * 1024
+HISTORY_IDLE_TTL = 24 * 3600
+
+
+def new_history_store():
+    if HISTORY_BACKEND == "sqlite":
+        return SQLiteHistoryStore(new_conversation, path=HISTORY_DB_PATH)
+    return MemoryHistoryStore(
+        new_conversation,
+        max_users=HISTORY_MAX_USERS,
+        max_bytes=HISTORY_MAX_BYTES,
+        idle_ttl=HISTORY_IDLE_TTL,
+    )
+
+
+history_store = new_history_store()
+
+# Rolling summaries: once a conversation passes SUMMARY_THRESHOLD_TOKENS, its older
+# turns are replaced by a summary written by the small model, in the background
+SUMMARIZE = True
+SUMMARY_THRESHOLD_TOKENS = 3000
+SUMMARY_KEEP_RECENT = 6     # newest messages always kept verbatim
+summarizer = Summarizer(
+    llm_client,
+    AVAILABLE_MODELS[SMALL_MODEL],
+    history_store,
+    threshold_tokens=SUMMARY_THRESHOLD_TOKENS,
+    keep_recent=SUMMARY_KEEP_RECENT,
+    input_tokens=MODEL_TOKEN_BUDGETS[SMALL_MODEL] - 1000,
+)
+
+
+# Handler metrics, plus the existing stats objects read at scrape time
+handler_latency = metrics.Histogram("bot_handler_seconds", "Handler latency", ["handler"])
+handler_in_flight = metrics.Gauge("bot_handler_in_flight", "Updates being handled", ["handler"])
+request_prompt_tokens = metrics.Histogram(
+    "bot_prompt_tokens", "Prompt tokens sent per AI request by model", ["model"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+)
+metrics.Gauge("bot_history_users", "Conversations held by the history store", callback=lambda: len(history_store))
+metrics.Gauge("bot_llm", "LLM client counters", ["stat"], callback=lambda: llm_client.stats())
+metrics.Gauge("bot_background", "Background task counters", ["stat"], callback=lambda: background.stats())
+metrics.Gauge("bot_rate_limit", "Admission control counters", ["stat"], callback=lambda: rate_limiter.stats())
+metrics.Gauge("bot_response_cache", "Response cache counters", ["stat"], callback=lambda: response_cache.stats())
+metrics.Gauge("bot_stream", "Streamed reply counters and TTFT", ["stat"], callback=stream_stats.summary)
+metrics.Gauge("bot_model_latency_seconds", "Rolling time to first token per model", ["model"],
+              callback=lambda: {name: stats.latency for name, stats in model_router.stats.items()})
+metrics.Gauge("bot_model_error_rate", "Rolling error rate per model", ["model"],
+              callback=lambda: {name: stats.error_rate for name, stats in model_router.stats.items()})
+metrics.Gauge("bot_summarizer", "Rolling summary counters", ["stat"], callback=lambda: summarizer.stats())
+metrics.Gauge("bot_content", "Jokes and stories loaded", ["stat"], callback=lambda: content.library.stats())
+metrics.Gauge("bot_log_dropped", "Log records dropped by sampling", callback=lambda: logs.sampler.dropped)
+metrics.Gauge("bot_scheduler", "Update scheduler counters", ["stat"],
+              callback=lambda: update_processor.stats() if update_processor else None)
+metrics.Gauge("bot_watchdog", "Loop watchdog counters", ["stat"], callback=lambda: watchdog.stats())
+metrics_server = metrics.MetricsServer(METRICS_HOST, METRICS_PORT)
+watchdog = Watchdog(threshold=WATCHDOG_THRESHOLD)
+metrics_server.routes["/profile"] = watchdog.profile_route
+metrics_server.routes["/stalls"] = watchdog.stalls_route
 
 
 if platform.system() == "Windows":
@@ -35,7 +211,7 @@ if platform.system() == "Windows":
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     user_name = update.effective_user.first_name
-    conversation_history[user_id] = []
+    history_store.clear(user_id)
     welcome_txt = f"""HELLO 👋, {user_name}!
 
 
@@ -59,14 +235,7 @@ Let's get started! What would you like to talk about?"""
 
 
     message = await update.message.reply_photo(photo=photo_url, caption=welcome_txt)
-
-
-    try:
-        await asyncio.sleep(0.5)
-        random_rec = reaction.reaction()
-        await message.set_reaction(reaction=[ReactionTypeEmoji(emoji=random_rec)])
-    except Exception as e:
-        print(f"Reaction error: {e}")
+    background.spawn(set_reaction(message, reaction.reaction()), "Reaction")
 
 
 # help command
@@ -75,122 +244,219 @@ async def help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /start — Start the bot
 /help — Show this help message
 /clear — Clear conversation history
+/model — Show or choose the AI model
 
 
 💬 HOW TO USE:
 Just send me any message and I'll respond with AI!
 Ask me about anything — I'm here to help!"""
     message = await update.message.reply_text(help_text)
-    try:
-        await asyncio.sleep(0.5)
-        await message.set_reaction(reaction=[ReactionTypeEmoji(emoji="❤")])
-    except Exception as e:
-        print(f"Reaction error: {e}")
+    background.spawn(set_reaction(message, "❤"), "Reaction")
 
 
 async def clear(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    conversation_history[user_id] = []
+    history_store.clear(user_id)
     clear_text = "✅ Conversation history cleared! Let's start fresh."
     message = await update.message.reply_text(clear_text)
-    try:
-        await asyncio.sleep(0.3)
-        await message.set_reaction(reaction=[ReactionTypeEmoji(emoji="✅")])
-    except Exception as e:
-        print(f"Reaction error: {e}")
+    background.spawn(set_reaction(message, "✅"), "Reaction")
+
+
+# model command: /model shows the current choice, /model <name> pins one, /model auto routes
+async def model(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    choice = context.args[0].lower() if context.args else None
+    options = ", ".join(["auto", *AVAILABLE_MODELS])
+    if choice is None:
+        model_text = f"🧠 Current model: {user_models.get(user_id, 'auto')}\nAvailable: {options}\nUse /model <name> to switch."
+    elif choice == "auto":
+        user_models.pop(user_id, None)
+        model_text = "✅ Model set to auto. I'll pick the best model for each message."
+    elif choice in AVAILABLE_MODELS:
+        user_models[user_id] = choice
+        model_text = f"✅ Model set to {choice}."
+    else:
+        model_text = f"Unknown model '{choice}'. Available: {options}"
+    message = await update.message.reply_text(model_text)
+    background.spawn(set_reaction(message, "👍"), "Reaction")
 
 
 async def ai_response(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     user_message = update.message.text
-    print(f"User message: {user_message}")
+    started = time.perf_counter()
+    log.info("message user=%s chars=%d", user_id, len(user_message))
 
-
-    # Send thinking sticker before processing
+    answer = None
+    streamed = None
     thinking_sticker = None
-    try:
-        # Replace this with your sticker file_id after getting it
-        thinking_sticker = await context.bot.send_sticker(
-            chat_id=update.effective_chat.id,
-            sticker="CAACAgQAAxkBAAEK99dlfC7LDqnuwtGRkIoacot_dGC4zQACbg8AAuHqsVDaMQeY6CcRojME"
-        )
-    except Exception as e:
-        print(f"Sticker send error: {e}")
+
+    # Hand the sticker over to the background for deletion (once)
+    async def remove_thinking_sticker():
+        nonlocal thinking_sticker
+        if thinking_sticker is not None:
+            background.spawn(delete_thinking_sticker(thinking_sticker), "Sticker delete")
+            thinking_sticker = None
 
 
     try:
-        answer = None
-        reaction_emoji = "👍"
-        
-        # Check for jokes
-        if "joke" in user_message.lower():
-            answer = my_jokes_and_story.get_my_jokes()
-            reaction_emoji = reaction.reaction()
-        # Check for story
-        elif "story" in user_message.lower():
-            answer = my_jokes_and_story.story()
-            reaction_emoji = reaction.reaction()
+        # Jokes, stories and other local intents never reach the AI
+        local_answer = intents.respond(user_message, user_id)
+        if local_answer is not None:
+            answer = local_answer
+        elif RATE_LIMITS and not rate_limiter.admit(user_id):
+            answer = BUSY_TEXT
         else:
+            # Send the thinking sticker alongside the AI call instead of before it
+            if show_thinking_sticker():
+                thinking_sticker = asyncio.create_task(
+                    context.bot.send_sticker(chat_id=update.effective_chat.id, sticker=THINKING_STICKER_ID)
+                )
+
             # AI response
             try:
-                print("Calling Groq AI...")
-
                 # Add user message to history
-                conversation_history[user_id].append({
-                    "role": "user",
-                    "content": user_message
-                })
-
-                # Keep only last MAX_HISTORY messages
-                if len(conversation_history[user_id]) > MAX_HISTORY:
-                    conversation_history[user_id] = conversation_history[user_id][-MAX_HISTORY:]
-
-                # Send entire conversation history to AI
-                chat_completion = groq_client.chat.completions.create(
-                    messages=conversation_history[user_id],
-                    model=AVAILABLE_MODELS[CURRENT_MODEL],
+                conversation = history_store.get(user_id)
+                conversation.append("user", user_message)
+                history_store.save(user_id, conversation)
+
+                # One attempt against one model, sending only the newest turns
+                # that fit its token budget
+                async def ask(name, on_first_token):
+                    nonlocal streamed
+                    model = AVAILABLE_MODELS[name]
+                    messages, prompt_tokens = conversation.window(MODEL_TOKEN_BUDGETS[name])
+                    log.debug("llm_request user=%s model=%s prompt_tokens=%d messages=%d/%d",
+                              user_id, name, prompt_tokens, len(messages), len(conversation))
+                    request_prompt_tokens.observe(prompt_tokens, model)
+                    if STREAM_REPLIES:
+                        streamed = ProgressiveReply(
+                            update.message,
+                            started=started,
+                            on_first_text=remove_thinking_sticker,
+                            min_interval=STREAM_EDIT_INTERVAL,
+                            min_chars=STREAM_EDIT_MIN_CHARS,
+                        )
+                        async for delta in llm_client.stream(messages, model, key=user_id,
+                                                             on_first_token=on_first_token):
+                            await streamed.feed(delta)
+                        return await streamed.finish()
+                    return await llm_client.complete(messages, model, key=user_id, on_first_token=on_first_token)
+
+                # Falls back to another model unless part of a streamed reply is already shown
+                preferred = user_models.get(user_id)
+                routed = lambda: model_router.complete(
+                    ask, conversation.total_tokens, preferred=preferred,
+                    can_fallback=lambda: streamed is None or not streamed.sent,
                 )
-                answer = chat_completion.choices[0].message.content
+                if RESPONSE_CACHE and len(conversation) - 1 <= RESPONSE_CACHE_MAX_CONTEXT:
+                    # Identical in-flight prompts share one upstream call
+                    key = response_cache.key(user_message, preferred or "auto", conversation.messages[:-1])
+                    answer = await response_cache.get_or_create(key, routed)
+                else:
+                    answer = await routed()
 
                 # Add AI response to history
-                conversation_history[user_id].append({
-                    "role": "assistant",
-                    "content": answer
-                })
+                conversation.append("assistant", answer)
+                history_store.save(user_id, conversation)
+                if SUMMARIZE:
+                    summarizer.maybe_schedule(user_id, conversation)
             except Exception as ai_error:
-                print(f"AI Error: {ai_error}")
-                answer = "I didn't understand. Try asking something else!"
-                reaction_emoji = reaction.reaction()
-
+                streamed = None
+                if getattr(ai_error, "status_code", None) == 429:
+                    log.warning("llm_rate_limited user=%s error=%r", user_id, ai_error)
+                    answer = BUSY_TEXT
+                else:
+                    log.error("llm_error user=%s error=%r", user_id, ai_error)
+                    answer = "I didn't understand. Try asking something else!"
 
-        # Delete the thinking sticker before sending response
-        if thinking_sticker:
-            try:
-                await thinking_sticker.delete()
-            except Exception as e:
-                print(f"Sticker delete error: {e}")
 
+        # Send response first (a streamed reply is already on screen)
+        if streamed is None or not streamed.sent:
+            await reply_in_parts(update.message, answer)
 
         # Add reaction to user's message
+        background.spawn(set_reaction(update.message, reaction.reaction()), "Reaction")
+
+
+    except Exception as e:
+        metrics.errors.inc("handler")
+        log.error("handler_error handler=ai_response user=%s error=%r", user_id, e)
+    finally:
+        await remove_thinking_sticker()
+
+
+def show_thinking_sticker():
+    # The sticker is pure decoration, so drop it when the AI path is busy
+    return THINKING_STICKER and llm_client.in_flight + llm_client.waiting < STICKER_LOAD_LIMIT
+
+
+async def delete_thinking_sticker(send_task):
+    sticker = await send_task
+    await sticker.delete()
+
+
+async def set_reaction(message, emoji):
+    await message.set_reaction(reaction=[ReactionTypeEmoji(emoji=emoji)])
+
+
+# Wraps a handler to record its latency, in-flight count and uncaught errors,
+# and labels its task for the watchdog
+def instrumented(name, handler):
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        handler_in_flight.inc(name)
+        started = time.perf_counter()
+        user = update.effective_user
         try:
-            await asyncio.sleep(0.3)
-            await update.message.set_reaction(reaction=[ReactionTypeEmoji(emoji=reaction.reaction())])
-        except Exception as e:
-            print(f"Reaction error: {e}")
+            with watchdog.track(name, f"update={update.update_id} user={user.id if user else '-'}"):
+                return await handler(update, context)
+        except Exception:
+            metrics.errors.inc("handler")
+            raise
+        finally:
+            handler_in_flight.dec(name)
+            handler_latency.observe(time.perf_counter() - started, name)
+    return wrapper
 
 
-        # Send response
-        await update.message.reply_text(answer)
+# Scheduling class of an update: "command", "canned" (local intents) or "ai"
+def update_class(update):
+    message = update.message
+    if message is None or not message.text or message.text.startswith("/"):
+        return "command"
+    if intents.classify(message.text) is not None:
+        return "canned"
+    return "ai"
 
 
-    except Exception as e:
-        print(f"Error: {e}")
-        # Clean up sticker if error occurs
-        if thinking_sticker:
-            try:
-                await thinking_sticker.delete()
-            except:
-                pass
+async def reply_busy(update):
+    await update.message.reply_text(BUSY_TEXT)
+
+
+# A dropped message still belongs to the conversation the newer one continues
+def keep_superseded(update):
+    user_id = update.effective_user.id
+    conversation = history_store.get(user_id)
+    conversation.append("user", update.message.text)
+    history_store.save(user_id, conversation)
+
+
+update_processor = None
+
+
+def new_update_processor():
+    global update_processor
+    update_processor = PriorityUpdateProcessor(
+        update_class,
+        reply_busy,
+        keep_superseded,
+        max_running=CONCURRENT_UPDATES,
+        max_ai=MAX_RUNNING_AI,
+        max_queued=MAX_QUEUED_AI,
+        max_wait=AI_MAX_WAIT,
+    )
+    return update_processor
 
 
 # Set menu feature in the chat_bot
@@ -199,30 +465,137 @@ async def set_manu(app):
         BotCommand("start", "Start the bot"),
         BotCommand("help", "Show help information"),
         BotCommand("clear", "Clear conversation history"),
+        BotCommand("model", "Show or choose the AI model"),
     ]
     await app.bot.set_my_commands(commands)
 
 
-if __name__ == "__main__":
-    # main function
-    print("Bot starting.....")
-    app = Application.builder().token(BOT_TOKEN).build()
+# A metrics port that cannot be bound (e.g. already in use) is logged and the
+# bot keeps serving without metrics
+async def start_monitoring(app):
+    watchdog.start(detect_stalls=WATCHDOG)
+    if metrics_server.port:
+        try:
+            await metrics_server.start()
+        except OSError as e:
+            metrics.errors.inc("metrics")
+            log.error("metrics_server_failed host=%s port=%d error=%r", metrics_server.host, metrics_server.port, e)
+            return
+        log.info("metrics_server url=http://%s:%d/metrics", metrics_server.host, metrics_server.port)
+
+
+# Builds what the first messages need (Groq client, intent patterns, jokes and
+# stories) so that no user waits for it
+def warm_up():
+    llm_client.client
+    intents.classify("")
+    content.library.maybe_reload()
+
+
+# Runs once the bot is initialized (the post_init hook). Updates are taken
+# right after it returns, so the warm-up runs in a thread and the command menu
+# is registered in the background meanwhile; workers have no menu to set.
+async def startup(app, menu=True):
+    await start_monitoring(app)
+    background.spawn(asyncio.to_thread(warm_up), "Warm up")
+    if menu:
+        background.spawn(set_manu(app), "Command menu")
+
+
+# Runs after the app stops taking updates, while the bot can still make API calls
+async def shutdown(app):
+    await background.drain()
+    await summarizer.drain()
+    await metrics_server.close()
+    await watchdog.stop()
+    history_store.close()
+
+
+# worker=True builds the app for a worker process: no updater (updates come
+# from the front process) and no command menu setup
+def build_application(token=BOT_TOKEN, base_url=None, worker=False):
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(new_update_processor() if PRIORITY_SCHEDULING else CONCURRENT_UPDATES)
+        .request(TimedRequest(connection_pool_size=CONNECTION_POOL_SIZE))
+        .post_init(functools.partial(startup, menu=False) if worker else startup)
+        .post_stop(shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    if worker:
+        builder = builder.updater(None)
+    app = builder.build()
 
 
     # Add handlers
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", help))
-    app.add_handler(CommandHandler("clear", clear))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, ai_response))
-    
-    # Removed get_sticker_id handler as requested
-
+    app.add_handler(CommandHandler("start", instrumented("start", start)))
+    app.add_handler(CommandHandler("help", instrumented("help", help)))
+    app.add_handler(CommandHandler("clear", instrumented("clear", clear)))
+    app.add_handler(CommandHandler("model", instrumented("model", model)))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented("ai_response", ai_response)))
+    return app
+
+
+# Runs in each spawned worker process (see workers.WorkerPool)
+def build_worker(index, token=BOT_TOKEN, base_url=None):
+    global rate_limiter
+    logs.setup_logging(LOG_LEVEL, LOG_MAX_PER_SECOND)
+    # Users are sharded, so per-user buckets stay exact; the global budget is split
+    rate_limiter = RateLimiter(USER_RATE, USER_BURST, GLOBAL_RATE / WORKERS, GLOBAL_BURST / WORKERS)
+    metrics_server.port = METRICS_PORT + 1 + index if METRICS_PORT else 0
+    return build_application(token, base_url, worker=True)
+
+
+# The front process: receives updates and forwards them to `pool`
+def build_front(pool, token=BOT_TOKEN, base_url=None):
+    async def front_startup(app):
+        background.spawn(set_manu(app), "Command menu")
+        await start_monitoring(app)
+        pool.supervise()
+
+    async def front_shutdown(app):
+        await background.drain()
+        await pool.stop()
+        await metrics_server.close()
+        await watchdog.stop()
+
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(TimedRequest(connection_pool_size=CONNECTION_POOL_SIZE))
+        .post_init(front_startup)
+        .post_stop(front_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.build()
+    app.add_handler(TypeHandler(Update, workers.forward_to(pool)))
+    return app
 
-    # Set menu asynchronously
-    nest_asyncio.apply()
-    asyncio.get_event_loop().run_until_complete(set_manu(app))
 
+if __name__ == "__main__":
+    # main function
+    log_listener = logs.setup_logging(LOG_LEVEL, LOG_MAX_PER_SECOND)
+    log.info("Bot starting.....")
+    if WORKERS > 1:
+        app = build_front(workers.WorkerPool(WORKERS, build_worker).start())
+    else:
+        app = build_application()
 
-    print("Bot is running...")
-    app.run_polling()
 
+    log.info("Bot is running...")
+    try:
+        if WEBHOOK_URL:
+            app.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET or None,
+            )
+        else:
+            app.run_polling()
+    finally:
+        log_listener.stop()
@@ -0,0 +1,180 @@
+import asyncio
+import bisect
+import math
+from urllib.parse import parse_qs, urlsplit
+
+
+# Minimal Prometheus-style metrics: counters, gauges and histograms with
+# positional label values, rendered in the text exposition format.
+# Updates are plain dict operations, cheap enough for every message.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY = []
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labels=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        (REGISTRY if registry is None else registry).append(self)
+
+    # (name suffix, label values, extra labels, value) for every series
+    def samples(self):
+        for label_values, value in self._values.items():
+            yield "", label_values, (), value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+
+# A gauge is either set directly or read from `callback` at scrape time. With one
+# label, the callback may return a dict of label value -> number (e.g. a stats()).
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, help, labels=(), registry=None, callback=None):
+        super().__init__(name, help, labels, registry)
+        self.callback = callback
+
+    def set(self, value, *label_values):
+        self._values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+    def samples(self):
+        if self.callback is None:
+            yield from super().samples()
+            return
+        value = self.callback()
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if isinstance(item, (int, float)):
+                    yield "", (key,), (), item
+        elif value is not None:
+            yield "", (), (), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(buckets)
+
+    # counts[i] is the number of observations in bucket i (not cumulative),
+    # the extra slot is +Inf and the last item is the running sum
+    def observe(self, value, *label_values):
+        counts = self._values.get(label_values)
+        if counts is None:
+            counts = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, *label_values):
+        counts = self._values.get(label_values)
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        for label_values, counts in self._values.items():
+            total = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                total += count
+                yield "_bucket", label_values, (("le", _format_value(bound)),), total
+            yield "_sum", label_values, (), counts[-1]
+            yield "_count", label_values, (), total
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return f"{value:.1f}"
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(registry=None):
+    lines = []
+    for metric in REGISTRY if registry is None else registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, label_values, extra, value in metric.samples():
+            pairs = [*zip(metric.labels, label_values), *extra]
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in pairs)
+            lines.append(f"{metric.name}{suffix}{{{labels}}} {_format_value(value)}" if labels
+                         else f"{metric.name}{suffix} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Tiny HTTP server on the bot's event loop. `routes` maps a path to a function
+# taking the parsed query string and returning (status, content type, body);
+# the function may be async. GET /metrics serves the registry.
+class MetricsServer:
+    def __init__(self, host="127.0.0.1", port=9469, registry=None):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.routes = {"/metrics": self._metrics}
+        self._server = None
+
+    def _metrics(self, query):
+        return 200, "text/plain; version=0.0.4", render(self.registry)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass        # headers are not needed
+            parts = request_line.decode("latin-1").split()
+            url = urlsplit(parts[1] if len(parts) > 1 else "/")
+            route = self.routes.get(url.path)
+            if route is None:
+                status, content_type, body = 404, "text/plain", "not found\n"
+            else:
+                result = route(parse_qs(url.query))
+                if asyncio.iscoroutine(result):
+                    result = await result
+                status, content_type, body = result
+        except Exception as e:
+            status, content_type, body = 500, "text/plain", f"{e}\n"
+        payload = body.encode() if isinstance(body, str) else body
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+# Shared by every module: failures counted by the stage they happened in
+errors = Counter("bot_errors_total", "Errors by stage", ["stage"])
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+
+# Classic token bucket: `rate` tokens per second, holding at most `burst`.
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_take(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+# Admission control in front of the AI path: one bucket per user plus one
+# global bucket. Per-user buckets are kept for at most `max_users` users (LRU).
+class RateLimiter:
+    def __init__(self, user_rate, user_burst, global_rate, global_burst, max_users=100_000):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_users = max_users
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self._buckets = OrderedDict()
+        self.admitted = 0
+        self.rejected_user = 0
+        self.rejected_global = 0
+
+    def admit(self, user_id):
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+
+        if not bucket.try_take(now):
+            self.rejected_user += 1
+            return False
+        if not self.global_bucket.try_take(now):
+            bucket.tokens += 1      # not the user's fault, give the token back
+            self.rejected_global += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def stats(self):
+        return {
+            "admitted": self.admitted,
+            "rejected_user": self.rejected_user,
+            "rejected_global": self.rejected_global,
+        }
+
+
+# Concurrency limit that hands free slots to waiting keys (users) round-robin,
+# so one chat with many queued requests cannot starve everyone else.
+class FairLimiter:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.active = 0
+        self.waiting = 0
+        self._queues = OrderedDict()    # key -> deque of waiter futures, in service order
+
+    def locked(self):
+        return self.active >= self.capacity
+
+    async def acquire(self, key=None):
+        if self.active < self.capacity and not self._queues:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+        self.waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()      # slot was handed over just before the cancel
+            else:
+                self._discard(key, future)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not future.done():
+                future.set_result(None)     # the slot passes straight to the waiter
+                return
+        self.active -= 1
+
+    def _discard(self, key, future):
+        queue = self._queues.get(key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._queues[key]
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+# "Hi!!", "hi" and "  HI " should all hit the same entry
+def normalize_prompt(text):
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+# LRU + TTL cache of AI answers with in-flight coalescing: concurrent misses
+# for the same key share one upstream call instead of each making their own.
+class ResponseCache:
+    def __init__(self, max_entries=1000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (answer, expires at)
+        self._in_flight = {}            # key -> Future shared by concurrent callers
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, prompt, model, context=()):
+        context_hash = ""
+        if context:
+            context_hash = hashlib.blake2b(json.dumps(list(context)).encode(), digest_size=8).hexdigest()
+        return normalize_prompt(prompt), model, context_hash
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, answer):
+        self._entries[key] = (answer, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # Cached answer for `key`, or the result of `create()` shared with every
+    # caller that asks for the same key while it is running
+    async def get_or_create(self, key, create):
+        answer = self.get(key)
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            answer = await create()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn if there are none
+            raise
+        finally:
+            del self._in_flight[key]
+        self.put(key, answer)
+        future.set_result(answer)
+        return answer
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,113 @@
+import logging
+import time
+
+from llm import is_upstream_error
+
+
+log = logging.getLogger(__name__)
+
+
+# Rolling time to first token and error rate of one model (exponentially weighted).
+class ModelStats:
+    __slots__ = ("latency", "error_rate", "requests", "errors")
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, latency, ok, alpha):
+        self.requests += 1
+        self.errors += not ok
+        self.error_rate += alpha * ((not ok) - self.error_rate)
+        if ok:
+            self.latency = latency if self.latency is None else self.latency + alpha * (latency - self.latency)
+
+
+# Picks the model for each AI request and falls back to the others on failure.
+# Short prompts go to `small`, long ones to `large`; a model that is failing
+# or much slower than the alternatives is moved behind them. Speed is the time
+# to the first token, which depends little on how long the answer gets, and
+# only errors for which `is_model_error(error)` holds count against a model.
+class ModelRouter:
+    def __init__(self, models, small, large, long_prompt_tokens=1000, alpha=0.2,
+                 max_error_rate=0.3, slow_factor=5.0, min_requests=5, is_model_error=is_upstream_error):
+        self.models = list(models)
+        self.small = small
+        self.large = large
+        self.long_prompt_tokens = long_prompt_tokens
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.slow_factor = slow_factor
+        self.min_requests = min_requests
+        self.is_model_error = is_model_error
+        self.stats = {name: ModelStats() for name in self.models}
+        self.fallbacks = 0
+
+    def score(self, name):
+        stats = self.stats[name]
+        latency = stats.latency if stats.latency is not None else 0.0
+        return latency * (1 + 4 * stats.error_rate)
+
+    def healthy(self, name):
+        stats = self.stats[name]
+        return stats.requests < self.min_requests or stats.error_rate <= self.max_error_rate
+
+    # Models to try, in order, for a prompt of `prompt_tokens`
+    def candidates(self, prompt_tokens, preferred=None):
+        if preferred in self.stats:
+            primary = preferred
+        else:
+            primary = self.large if prompt_tokens > self.long_prompt_tokens else self.small
+        others = sorted((name for name in self.models if name != primary), key=self.score)
+        if preferred is None and others:
+            best = others[0]
+            primary_latency = self.stats[primary].latency
+            best_latency = self.stats[best].latency
+            slow = (
+                primary_latency is not None and best_latency is not None
+                and primary_latency > self.slow_factor * best_latency
+            )
+            if self.healthy(best) and (not self.healthy(primary) or slow):
+                others[0], primary = primary, best
+                others.sort(key=self.score)
+        return [primary] + others
+
+    def record(self, name, latency, ok):
+        self.stats[name].record(latency, ok, self.alpha)
+
+    # Runs `call(model_name, on_first_token)` on each candidate until one
+    # succeeds; the call reports its time to first token through
+    # `on_first_token(seconds)`, else the whole call is timed. Other errors than
+    # model errors are raised right away. Stops early if `can_fallback()` says a
+    # retry is no longer possible (e.g. text shown).
+    async def complete(self, call, prompt_tokens, preferred=None, can_fallback=None):
+        candidates = self.candidates(prompt_tokens, preferred)
+        for i, name in enumerate(candidates):
+            first_token = []
+            started = time.perf_counter()
+            try:
+                result = await call(name, first_token.append)
+            except Exception as e:
+                if not self.is_model_error(e):
+                    raise
+                self.record(name, time.perf_counter() - started, ok=False)
+                if i == len(candidates) - 1 or (can_fallback is not None and not can_fallback()):
+                    raise
+                self.fallbacks += 1
+                log.warning("model_fallback model=%s next=%s error=%r", name, candidates[i + 1], e)
+                continue
+            self.record(name, first_token[0] if first_token else time.perf_counter() - started, ok=True)
+            return result
+
+    def summary(self):
+        return {
+            name: {
+                "latency": stats.latency,
+                "error_rate": round(stats.error_rate, 3),
+                "requests": stats.requests,
+                "errors": stats.errors,
+            }
+            for name, stats in self.stats.items()
+        } | {"fallbacks": self.fallbacks}
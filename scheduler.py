@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from telegram.ext import BaseUpdateProcessor
+
+import metrics
+
+
+log = logging.getLogger(__name__)
+
+# Update classes, highest priority first
+CLASSES = ("command", "canned", "ai")
+
+queue_wait = metrics.Histogram(
+    "bot_queue_wait_seconds", "Time an update waited for a slot", ["class"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class _Waiter:
+    __slots__ = ("kind", "user_id", "future", "queued")
+
+    def __init__(self, kind, user_id, future):
+        self.kind = kind
+        self.user_id = user_id
+        self.future = future
+        self.queued = time.monotonic()
+
+
+# Update processor with priority classes. `classify(update)` returns one of
+# CLASSES. At most `max_running` updates run at once, AI updates at most
+# `max_ai` of them, so commands and canned replies always find a slot; free
+# slots go to the highest class first. Up to `max_queued` AI updates wait;
+# beyond that, or as soon as one has waited `max_wait` seconds, it is shed
+# from the queue and `on_shed(update)` sends a quick busy reply instead.
+# A queued AI update is dropped when the same user sends a newer one;
+# `on_superseded(update)` can keep its text for context.
+# A waiter's future resolves to True (run), False (superseded) or None (expired).
+class PriorityUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, classify, on_shed, on_superseded=None, max_running=256, max_ai=192,
+                 max_queued=512, max_wait=30.0):
+        super().__init__(max_running + max_queued)
+        self.classify = classify
+        self.on_shed = on_shed
+        self.on_superseded = on_superseded
+        self.max_running = max_running
+        self.max_ai = max_ai
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self._queues = {kind: deque() for kind in CLASSES}
+        self._latest_ai = {}    # user_id -> newest queued or running AI update
+        self.running = 0
+        self.running_ai = 0
+        self.queued_ai = 0
+        self.shed = 0
+        self.expired = 0
+        self.superseded = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _can_start(self, kind):
+        return self.running < self.max_running and (kind != "ai" or self.running_ai < self.max_ai)
+
+    # Hands free slots to waiters, highest class first, FIFO within a class
+    def _dispatch(self):
+        for kind in CLASSES:
+            queue = self._queues[kind]
+            while queue and self._can_start(kind):
+                waiter = queue.popleft()
+                if waiter.future.done():
+                    continue        # superseded or cancelled while queued
+                self.running += 1
+                if kind == "ai":
+                    self.running_ai += 1
+                    self.queued_ai -= 1
+                waiter.future.set_result(True)
+
+    # Deadline of a queued AI update: it leaves the queue without taking a slot
+    def _expire(self, waiter):
+        if waiter.future.done():
+            return
+        waiter.future.set_result(None)
+        self.queued_ai -= 1
+        if self._latest_ai.get(waiter.user_id) is waiter:
+            del self._latest_ai[waiter.user_id]
+
+    def _release(self, waiter):
+        self.running -= 1
+        if waiter.kind == "ai":
+            self.running_ai -= 1
+            if self._latest_ai.get(waiter.user_id) is waiter:
+                del self._latest_ai[waiter.user_id]
+        self._dispatch()
+
+    async def do_process_update(self, update, coroutine):
+        kind = self.classify(update)
+        user = getattr(update, "effective_user", None)
+        waiter = _Waiter(kind, user.id if user else None, asyncio.get_running_loop().create_future())
+        if kind == "ai":
+            previous = self._latest_ai.get(waiter.user_id)
+            if previous is not None and not previous.future.done():
+                previous.future.set_result(False)
+                self.queued_ai -= 1
+            if self.queued_ai >= self.max_queued and not self._can_start(kind):
+                coroutine.close()
+                await self._shed(update, "queue_full")
+                return
+            self._latest_ai[waiter.user_id] = waiter
+            self.queued_ai += 1
+        self._queues[kind].append(waiter)
+        self._dispatch()
+
+        deadline = None
+        if kind == "ai" and not waiter.future.done():
+            deadline = asyncio.get_running_loop().call_later(self.max_wait, self._expire, waiter)
+        try:
+            started = await waiter.future
+        except asyncio.CancelledError:
+            # cancelling this task cancels the future too while it is pending
+            if waiter.future.cancelled() or not waiter.future.done():
+                waiter.future.cancel()
+                if kind == "ai":
+                    self.queued_ai -= 1
+                    if self._latest_ai.get(waiter.user_id) is waiter:
+                        del self._latest_ai[waiter.user_id]
+            elif waiter.future.result() is True:
+                self._release(waiter)
+            coroutine.close()
+            raise
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+        waited = time.monotonic() - waiter.queued
+        queue_wait.observe(waited, kind)
+
+        if started is None:
+            coroutine.close()
+            self.expired += 1
+            await self._shed(update, "expired")
+            return
+        if not started:
+            coroutine.close()
+            self.superseded += 1
+            log.info("update_superseded user=%s waited=%.3f", waiter.user_id, waited)
+            if self.on_superseded is not None:
+                self.on_superseded(update)
+            return
+        try:
+            await coroutine
+        finally:
+            self._release(waiter)
+
+    async def _shed(self, update, reason):
+        self.shed += 1
+        metrics.errors.inc("shed")
+        log.warning("update_shed reason=%s queued_ai=%d running=%d", reason, self.queued_ai, self.running)
+        try:
+            await self.on_shed(update)
+        except Exception as e:
+            log.warning("shed_reply_failed error=%r", e)
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "running_ai": self.running_ai,
+            "queued_ai": self.queued_ai,
+            "queued": self.queued_ai + len(self._queues["command"]) + len(self._queues["canned"]),
+            "shed": self.shed,
+            "expired": self.expired,
+            "superseded": self.superseded,
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+
+log = logging.getLogger(__name__)
+
+TELEGRAM_MAX_LENGTH = 4096
+MAX_RETRY_WAIT = 5.0        # longest flood-control wait honoured before giving up on a call
+
+
+# Text in chunks that fit one Telegram message (none for empty text)
+def split_message(text, limit=TELEGRAM_MAX_LENGTH):
+    return [text[i:i + limit] for i in range(0, len(text), limit)]
+
+
+# Sends `text` as one reply, or as several when it is longer than a message
+async def reply_in_parts(message, text):
+    for part in split_message(text) or [text]:
+        await message.reply_text(part)
+
+
+# Seconds Telegram asked us to wait (RetryAfter), 0 for other errors
+def retry_after(error):
+    delay = getattr(error, "retry_after", 0) or 0
+    return delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+
+
+# Rolling time-to-first-visible-text samples for streamed replies.
+class StreamStats:
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.replies = 0
+        self.edits = 0
+
+    def record_first_text(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"replies": self.replies, "edits": self.edits}
+        return {
+            "replies": self.replies,
+            "edits": self.edits,
+            "ttft_p50": samples[len(samples) // 2],
+            "ttft_p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        }
+
+
+stream_stats = StreamStats()
+
+
+# Progressively shows a streamed answer in a single Telegram message.
+# The first text is sent as a reply as soon as it arrives; later text is
+# coalesced into edits at most every `min_interval` seconds and only once
+# `min_chars` new characters have accumulated, to stay under edit rate limits.
+# Telegram calls are best-effort while streaming: a failed send or edit is
+# logged and retried later (after any flood-control wait), never raised into
+# the stream. finish() delivers the final text, with anything past the first
+# message's 4096 characters as follow-up messages.
+class ProgressiveReply:
+    def __init__(self, message, started=None, on_first_text=None, min_interval=1.0, min_chars=40):
+        self.message = message
+        self.started = time.perf_counter() if started is None else started
+        self.on_first_text = on_first_text
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.text = ""
+        self.reply = None
+        self.failures = 0
+        self._shown = ""
+        self._last_edit = 0.0
+        self._backoff_until = 0.0
+
+    @property
+    def sent(self):
+        return self.reply is not None
+
+    async def feed(self, delta):
+        self.text += delta
+        now = time.perf_counter()
+        if now < self._backoff_until:
+            return
+        if self.reply is None:
+            if self.text.strip():
+                await self._send_first()
+            return
+        if now - self._last_edit >= self.min_interval and len(self.text) - len(self._shown) >= self.min_chars:
+            await self._edit()
+
+    async def finish(self):
+        if self.reply is None:
+            if self.text.strip():
+                await self._send_first(retry=True)
+        else:
+            await self._edit(retry=True)
+        if self.reply is not None:
+            # the first message holds at most 4096 characters; the rest follows
+            for part in split_message(self.text[len(self._shown):]):
+                await self._call(self.message.reply_text, part, retry=True)
+        return self.text
+
+    # Runs one Telegram call; returns None instead of raising when it fails.
+    # With `retry`, waits out a short flood-control delay and tries once more.
+    async def _call(self, method, text, retry=False):
+        for attempt in range(2 if retry else 1):
+            try:
+                return await method(text)
+            except Exception as e:
+                self.failures += 1
+                delay = retry_after(e)
+                self._backoff_until = time.perf_counter() + max(delay, self.min_interval)
+                log.warning("stream_telegram_error attempt=%d retry_after=%.1f error=%r", attempt + 1, delay, e)
+                if not retry or attempt or delay > MAX_RETRY_WAIT:
+                    return None
+                await asyncio.sleep(delay)
+        return None
+
+    async def _send_first(self, retry=False):
+        if self.on_first_text is not None:
+            await self.on_first_text()
+        shown = self.text[:TELEGRAM_MAX_LENGTH]
+        reply = await self._call(self.message.reply_text, shown, retry=retry)
+        if reply is None:
+            return
+        self.reply = reply
+        self._shown = shown
+        self._last_edit = time.perf_counter()
+        stream_stats.replies += 1
+        stream_stats.record_first_text(self._last_edit - self.started)
+
+    async def _edit(self, retry=False):
+        shown = self.text[:TELEGRAM_MAX_LENGTH]
+        if shown == self._shown:
+            return
+        self._last_edit = time.perf_counter()
+        if await self._call(self.reply.edit_text, shown, retry=retry) is not None:
+            self._shown = shown
+            stream_stats.edits += 1
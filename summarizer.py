@@ -0,0 +1,123 @@
+import logging
+from collections import OrderedDict
+
+import metrics
+from background import BackgroundTasks
+from history_store import conversation_bytes
+
+
+log = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between a user and an AI assistant. Keep names, facts, "
+    "preferences, decisions and open questions the assistant will need later. Write short plain "
+    "sentences, at most 150 words, and nothing else."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+# Compresses the older part of long conversations into one summary message.
+# Runs on its own small BackgroundTasks pool after the reply is sent, so it
+# never delays a user; a conversation that changed meanwhile is left alone.
+# The savings per user are kept for the last `max_users` users summarized.
+class Summarizer:
+    def __init__(self, llm_client, model, history_store, threshold_tokens=3000, keep_recent=6,
+                 input_tokens=5000, max_tokens=300, max_concurrency=4, max_users=100_000):
+        self.llm_client = llm_client
+        self.model = model
+        self.history_store = history_store
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent = keep_recent
+        self.input_tokens = input_tokens
+        self.max_tokens = max_tokens
+        self.max_users = max_users
+        self.tasks = BackgroundTasks(max_concurrency=max_concurrency, max_pending=1000)
+        self._pending = set()
+        self.saved = OrderedDict()      # user_id -> [tokens saved, bytes saved]
+        self.summaries = 0
+        self.failed = 0
+        self.stale = 0
+        self.tokens_saved = 0
+        self.bytes_saved = 0
+
+    def maybe_schedule(self, user_id, conversation):
+        if conversation.total_tokens <= self.threshold_tokens or user_id in self._pending:
+            return
+        if len(conversation) <= self.keep_recent + 1:
+            return
+        self._pending.add(user_id)
+        if self.tasks.spawn(self._summarize(user_id, conversation), "Summarize") is None:
+            self._pending.discard(user_id)
+
+    # Oldest messages to fold into the summary: everything but the newest
+    # `keep_recent`, limited to what fits in the summary model's input
+    def _prefix(self, conversation):
+        end = len(conversation) - self.keep_recent
+        tokens = 0
+        count = 0
+        while count < end and tokens + conversation.token_counts[count] <= self.input_tokens:
+            tokens += conversation.token_counts[count]
+            count += 1
+        return conversation.messages[:count]
+
+    async def _summarize(self, user_id, conversation):
+        try:
+            prefix = self._prefix(conversation)
+            if len(prefix) < 2:
+                return
+            transcript = "\n".join(f"{m['role']}: {m['content']}" for m in prefix)
+            summary = await self.llm_client.complete(
+                [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": transcript}],
+                self.model,
+                key="summarizer",
+                max_tokens=self.max_tokens,
+            )
+            before_tokens = conversation.total_tokens
+            before_bytes = conversation_bytes(conversation)
+            # skip if the user cleared (or lost) the history while we waited
+            if self.history_store.get(user_id) is not conversation or \
+                    not conversation.replace_prefix(prefix, SUMMARY_PREFIX + summary.strip()):
+                self.stale += 1
+                return
+            self.history_store.save(user_id, conversation)
+            self._record(user_id, before_tokens - conversation.total_tokens,
+                         before_bytes - conversation_bytes(conversation))
+            log.info("summarized user=%s messages=%d tokens_saved=%d", user_id, len(prefix),
+                     before_tokens - conversation.total_tokens)
+        except Exception:
+            self.failed += 1
+            metrics.errors.inc("summarizer")
+            raise
+        finally:
+            self._pending.discard(user_id)
+
+    def _record(self, user_id, tokens, size):
+        self.summaries += 1
+        self.tokens_saved += tokens
+        self.bytes_saved += size
+        entry = self.saved.get(user_id)
+        if entry is None:
+            entry = self.saved[user_id] = [0, 0]
+            if len(self.saved) > self.max_users:
+                self.saved.popitem(last=False)
+        else:
+            self.saved.move_to_end(user_id)
+        entry[0] += tokens
+        entry[1] += size
+
+    # (prompt tokens, bytes) saved for one user so far
+    def saved_for(self, user_id):
+        return tuple(self.saved.get(user_id, (0, 0)))
+
+    async def drain(self):
+        await self.tasks.drain()
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "summaries": self.summaries,
+            "failed": self.failed,
+            "stale": self.stale,
+            "tokens_saved": self.tokens_saved,
+            "bytes_saved": self.bytes_saved,
+        }
@@ -0,0 +1,159 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+
+from telegram import Update
+
+import metrics
+
+
+log = logging.getLogger(__name__)
+
+forwarded = metrics.Counter("bot_forwarded_total", "Updates forwarded to each worker", ["worker"])
+restarts = metrics.Counter("bot_worker_restarts_total", "Worker processes restarted after dying", ["worker"])
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+# Consistent hash ring: each node owns `replicas` points, and a key belongs to
+# the first point at or after its hash. Adding or removing a node only moves
+# the keys next to that node's points.
+class HashRing:
+    def __init__(self, nodes, replicas=100):
+        self._points = sorted((_hash(f"{node}:{i}"), node) for node in nodes for i in range(replicas))
+        self._hashes = [point for point, _ in self._points]
+
+    def node_for(self, key):
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._points)
+        return self._points[i][1]
+
+
+# Chat (or user) an update belongs to, so all of a conversation lands on one worker
+def shard_key(update):
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return update.update_id
+
+
+# Worker processes that each run their own Application without an updater.
+# The front process receives updates and calls dispatch(); each update goes to
+# the worker that owns its chat on the hash ring. `build_worker(index, *args)`
+# must be a module-level function (it is pickled into the spawned process) that
+# returns the worker's Application. Dead workers are restarted with the same
+# index, so their chats come back to them.
+class WorkerPool:
+    def __init__(self, count, build_worker, args=(), replicas=100):
+        self.count = count
+        self.build_worker = build_worker
+        self.args = args
+        self.ring = HashRing(range(count), replicas)
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue() for _ in range(count)]
+        self.ready = [self._context.Event() for _ in range(count)]
+        self.processes = [None] * count
+        self._supervisor = None
+
+    def start(self):
+        for index in range(self.count):
+            self._spawn(index)
+        return self
+
+    def _spawn(self, index):
+        self.ready[index].clear()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.queues[index], self.ready[index], self.build_worker, self.args),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    # Blocks until every worker has started its Application
+    def wait_ready(self, timeout=None):
+        return all(event.wait(timeout) for event in self.ready)
+
+    def dispatch(self, update):
+        index = self.ring.node_for(shard_key(update))
+        self.queues[index].put(update.to_dict())
+        forwarded.inc(str(index))
+
+    # Restarts dead workers every `interval` seconds (runs on the front's loop)
+    def supervise(self, interval=1.0):
+        self._supervisor = asyncio.create_task(self._supervise(interval))
+
+    async def _supervise(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    log.error("worker_died worker=%d exitcode=%s", index, process.exitcode)
+                    restarts.inc(str(index))
+                    self._spawn(index)
+
+    async def stop(self, timeout=10.0):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        for q in self.queues:
+            q.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+# Handler for the front process: every update is forwarded, none handled here
+def forward_to(pool):
+    async def forward(update, context):
+        pool.dispatch(update)
+    return forward
+
+
+def _worker_main(index, updates, ready, build_worker, args):
+    asyncio.run(_serve(index, updates, ready, build_worker(index, *args)))
+
+
+# Mirrors run_polling's lifecycle, feeding the app's update queue from `updates`
+async def _serve(index, updates, ready, app):
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    loop = asyncio.get_running_loop()
+    ready.set()
+    log.info("worker_started worker=%d", index)
+    try:
+        running = True
+        while running:
+            for data in await loop.run_in_executor(None, _get_batch, updates):
+                if data is None:
+                    running = False
+                    break
+                await app.update_queue.put(Update.de_json(data, app.bot))
+    finally:
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+# One blocking get, then whatever else is already queued (fewer thread hops)
+def _get_batch(updates, limit=256):
+    batch = [updates.get()]
+    try:
+        while len(batch) < limit and batch[-1] is not None:
+            batch.append(updates.get_nowait())
+    except queue.Empty:
+        pass
+    return batch